@@ -1,21 +1,35 @@
 import os
+import sys
 from dotenv import load_dotenv
 import chromadb
-from chromadb.utils import embedding_functions
+from chromadb import EmbeddingFunction
 import numpy as np
 import uuid
 
+# Reuse the shared encoder registry and embedding cache from embeddings-demo
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'embeddings-demo', 'src'))
+from encoding import encode
+
 # Load environment variables
 load_dotenv()
 
+class CachedSentenceTransformerEmbeddingFunction(EmbeddingFunction):
+    """Chroma embedding function backed by the shared model and on-disk embedding cache"""
+    def __init__(self, model_name='all-MiniLM-L6-v2'):
+        self.model_name = model_name
+
+    def __call__(self, input):
+        # Only documents missing from the cache are encoded
+        return encode(input, self.model_name).tolist()
+
 class VectorDBOperations:
     def __init__(self, collection_name="demo_collection"):
         # Initialize ChromaDB client
         self.client = chromadb.Client()
         self.collection_name = collection_name
         
-        # Initialize the embedding function using sentence-transformers
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
+        # Initialize the embedding function using the shared, cached sentence-transformer
+        self.embedding_function = CachedSentenceTransformerEmbeddingFunction(
             model_name='all-MiniLM-L6-v2'
         )
         
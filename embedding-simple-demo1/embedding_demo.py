@@ -1,15 +1,21 @@
+import os
+import sys
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import faiss
 from sklearn.metrics.pairwise import cosine_similarity
 import torch
 import torch.nn as nn
 
+# Share the process-wide encoder registry from embeddings-demo so the model
+# is loaded once instead of on every call
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'embeddings-demo', 'src'))
+from encoder_registry import get_encoder
+from encoding import encode
+from binary_codes import two_stage_search
+from projection import Projector, display_sample
+
 # 1. Basic Text Embeddings
 def basic_embeddings():
-    # Initialize the model
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    
     # Sample texts
     texts = [
         "I love machine learning",
@@ -19,8 +25,8 @@ def basic_embeddings():
         "Neural networks are powerful"
     ]
     
-    # Generate embeddings
-    embeddings = model.encode(texts)
+    # Generate embeddings with the shared model, reusing cached ones
+    embeddings = encode(texts)
     print(f"Shape of embeddings: {embeddings.shape}")
     return embeddings, texts
 
@@ -52,25 +58,31 @@ def demonstrate_custom_embedding():
     return embeddings
 
 # 3. Vector Similarity Search
-def vector_similarity_search(embeddings, texts, query_text, top_k=2):
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+def vector_similarity_search(embeddings, texts, query_text, top_k=2, two_stage=False, oversample=10):
+    model = get_encoder()
     
     # Convert query to embedding
     query_embedding = model.encode([query_text])
     
-    # Initialize FAISS index
-    dimension = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dimension)
-    
-    # Add embeddings to index
-    index.add(embeddings.astype('float32'))
-    
-    # Search
-    distances, indices = index.search(query_embedding.astype('float32'), top_k)
+    if two_stage:
+        # Hamming scan over sign bits, then exact L2 re-ranking of top_k * oversample candidates
+        distances, indices = two_stage_search(embeddings, query_embedding, top_k, oversample=oversample)
+    else:
+        # Initialize FAISS index
+        dimension = embeddings.shape[1]
+        index = faiss.IndexFlatL2(dimension)
+        
+        # Add embeddings to index
+        index.add(embeddings.astype('float32'))
+        
+        # Search
+        distances, indices = index.search(query_embedding.astype('float32'), top_k)
     
     # Return results
     results = []
     for i, (dist, idx) in enumerate(zip(distances[0], indices[0])):
+        if idx < 0:
+            continue  # fewer candidates than top_k
         results.append({
             'text': texts[idx],
             'distance': dist,
@@ -86,22 +98,24 @@ def compute_similarity_matrix(embeddings):
     return similarity_matrix
 
 # 5. Embedding Visualization (using dimensionality reduction)
-def visualize_embeddings(embeddings, texts):
-    from sklearn.manifold import TSNE
+def visualize_embeddings(embeddings, texts, projector=None, max_points=2000):
     import matplotlib.pyplot as plt
     
     # Reduce dimensionality to 2D
-    # Use lower perplexity value for small sample size
-    tsne = TSNE(n_components=2, random_state=42, perplexity=2)
-    embeddings_2d = tsne.fit_transform(embeddings)
+    # t-SNE is fitted on a sample only; pass a fitted projector to place new points without refitting
+    if projector is None:
+        projector = Projector('tsne').fit(embeddings)
+    shown = display_sample(embeddings, max_points)
+    embeddings_2d = projector.transform(embeddings[shown])
     
     # Plot
     plt.figure(figsize=(10, 6))
     plt.scatter(embeddings_2d[:, 0], embeddings_2d[:, 1])
     
-    # Add labels
-    for i, text in enumerate(texts):
-        plt.annotate(text, (embeddings_2d[i, 0], embeddings_2d[i, 1]))
+    # Add labels (only readable for small samples)
+    if len(shown) <= 50:
+        for point, i in zip(embeddings_2d, shown):
+            plt.annotate(texts[i], (point[0], point[1]))
     
     plt.title("2D Visualization of Text Embeddings")
     plt.xlabel("First Component")
@@ -126,6 +140,12 @@ def main():
     for r in results:
         print(f"Text: {r['text']}, Distance: {r['distance']:.4f}")
     
+    # Same search, scanning binary codes first and re-ranking with the float vectors
+    results = vector_similarity_search(embeddings, texts, query, two_stage=True)
+    print("\n3b. Two-Stage (Binary + Re-rank) Search Results:")
+    for r in results:
+        print(f"Text: {r['text']}, Distance: {r['distance']:.4f}")
+    
     # 4. Compute similarity matrix
     similarity_matrix = compute_similarity_matrix(embeddings)
     print("\n4. Similarity Matrix Shape:", similarity_matrix.shape)
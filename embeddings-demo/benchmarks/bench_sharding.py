@@ -0,0 +1,63 @@
+"""Query throughput of ShardedVectorStore as the number of shards grows.
+
+Uses random vectors, so no model download is needed:
+
+    python benchmarks/bench_sharding.py --vectors 200000 --queries 2000
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from sharded_store import ShardedVectorStore
+
+
+def shard_counts(max_shards):
+    """1, 2, 4, ... up to max_shards, always including max_shards itself."""
+    counts = []
+    n = 1
+    while n < max_shards:
+        counts.append(n)
+        n *= 2
+    counts.append(max_shards)
+    return counts
+
+
+def run(n_vectors, n_queries, dimension, k, batch_size, max_shards):
+    rng = np.random.default_rng(42)
+    embeddings = rng.standard_normal((n_vectors, dimension)).astype(np.float32)
+    queries = rng.standard_normal((n_queries, dimension)).astype(np.float32)
+    texts = [f"text {i}" for i in range(n_vectors)]
+
+    print(f"{n_vectors} vectors, {n_queries} queries, k={k}, query batches of {batch_size}")
+    print(f"{'shards':>6} {'queries/s':>12} {'speedup':>8}")
+    baseline = None
+    for n_shards in shard_counts(max_shards):
+        with ShardedVectorStore(n_shards, dimension=dimension) as store:
+            store.add_texts(texts, embeddings)
+            store.search_embeddings(queries[:batch_size], k)  # warm-up
+
+            start = time.perf_counter()
+            for batch_start in range(0, n_queries, batch_size):
+                store.search_embeddings(queries[batch_start:batch_start + batch_size], k)
+            qps = n_queries / (time.perf_counter() - start)
+
+        baseline = baseline or qps
+        print(f"{n_shards:>6} {qps:>12.1f} {qps / baseline:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vectors', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=2_000)
+    parser.add_argument('--dimension', type=int, default=384)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--max-shards', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    run(args.vectors, args.queries, args.dimension, args.k, args.batch_size, args.max_shards)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Offline benchmarks for the vector search stack: throughput, latency, peak memory and recall.
+
+Texts are encoded by a deterministic stub encoder, so no model download or
+network access is needed. Every case runs in a fresh process so its peak RSS
+is its own. Results are written as JSON; pass --baseline to compare with an
+earlier run and exit non-zero on regressions:
+
+    python benchmarks/bench_suite.py --sizes 10000 100000 --output results.json
+    python benchmarks/bench_suite.py --sizes 10000 --baseline results.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stub_encoder import StubEncoder, register_stub_encoder
+
+BENCHMARKS = ('add', 'search', 'batch_search', 'similar_pairs', 'clustering')
+
+
+def corpus_texts(n):
+    return [f"synthetic document {i}" for i in range(n)]
+
+
+def query_texts(n):
+    return [f"synthetic query {i}" for i in range(n)]
+
+
+def exact_neighbors(embeddings, queries, k):
+    """Ground-truth L2 neighbours of every query by brute force."""
+    index = faiss.IndexFlatL2(embeddings.shape[1])
+    index.add(embeddings)
+    return index.search(queries, k)[1]
+
+
+def recall_at_k(found, expected):
+    """Mean share of the exact top-k that each result list recovered."""
+    return float(np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found, expected)]))
+
+
+def latency_summary(seconds):
+    seconds = np.asarray(seconds) * 1000
+    return {'p50_ms': float(np.percentile(seconds, 50)), 'p99_ms': float(np.percentile(seconds, 99))}
+
+
+def peak_rss_bytes():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def build_store(embeddings, texts, index_type, add_batch_size=10000):
+    """VectorStore holding the corpus, plus the seconds each add_texts batch took."""
+    from vector_store import VectorStore
+    params = {'nlist': max(16, int(4 * np.sqrt(len(texts))))} if index_type.startswith('ivf') else {}
+    store = VectorStore(dimension=embeddings.shape[1], index_type=index_type,
+                        rescore=index_type in ('sq8', 'sq_fp16'), **params)
+    if not store.is_trained:
+        store.train(embeddings=embeddings[:min(len(embeddings), 100_000)])
+    timings = []
+    for start in range(0, len(texts), add_batch_size):
+        batch_start = time.perf_counter()
+        store.add_texts(texts[start:start + add_batch_size], embeddings[start:start + add_batch_size])
+        timings.append(time.perf_counter() - batch_start)
+    return store, timings
+
+
+def run_case(benchmark, n, index_type, k, n_queries, batch_size, threshold, ground_truth):
+    """Run one benchmark in the current process and return its result dict."""
+    register_stub_encoder()
+    encoder = StubEncoder()
+    texts = corpus_texts(n)
+    embeddings = encoder.encode(texts)
+    queries = query_texts(n_queries)
+    result = {'benchmark': benchmark, 'n': n, 'k': k}
+
+    if benchmark in ('add', 'search', 'batch_search'):
+        result['index_type'] = index_type
+        start = time.perf_counter()
+        store, add_timings = build_store(embeddings, texts, index_type)
+        elapsed = time.perf_counter() - start
+        if benchmark == 'add':
+            result.update(seconds=elapsed, throughput=n / elapsed, unit='vectors/s',
+                          **latency_summary(add_timings))
+        elif benchmark == 'search':
+            found, timings = [], []
+            for query in queries:
+                query_start = time.perf_counter()
+                results = store.similarity_search(query, k)
+                timings.append(time.perf_counter() - query_start)
+                found.append([r['id'] for r in results])
+            result.update(seconds=sum(timings), throughput=n_queries / sum(timings), unit='queries/s',
+                          recall_at_k=recall_at_k(found, ground_truth), **latency_summary(timings))
+        else:
+            found, timings = [], []
+            for batch_start in range(0, n_queries, batch_size):
+                query_start = time.perf_counter()
+                batch_results = store.similarity_search_batch(queries[batch_start:batch_start + batch_size], k,
+                                                              batch_size=batch_size)
+                timings.append(time.perf_counter() - query_start)
+                found.extend([r['id'] for r in results] for results in batch_results)
+            result.update(seconds=sum(timings), throughput=n_queries / sum(timings), unit='queries/s',
+                          batch_size=batch_size, recall_at_k=recall_at_k(found, ground_truth),
+                          **latency_summary(timings))
+
+    elif benchmark == 'similar_pairs':
+        from similarity_search import SimilaritySearchDemo
+        demo = SimilaritySearchDemo()
+        start = time.perf_counter()
+        pairs = demo.find_similar_pairs(embeddings, texts, threshold=threshold)
+        elapsed = time.perf_counter() - start
+        result.update(seconds=elapsed, throughput=n / elapsed, unit='texts/s', threshold=threshold, pairs=len(pairs))
+
+    elif benchmark == 'clustering':
+        from similarity_search import SimilaritySearchDemo
+        demo = SimilaritySearchDemo()
+        start = time.perf_counter()
+        clusters = demo.semantic_clustering(embeddings, texts, n_neighbors=k)
+        elapsed = time.perf_counter() - start
+        # Check the neighbour lists of a sample of texts against brute-force cosine neighbours
+        sample = np.random.default_rng(0).choice(n, min(n, 200), replace=False)
+        normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        similarities = normalized[sample] @ normalized.T
+        similarities[np.arange(len(sample)), sample] = -np.inf  # a text is not its own neighbour
+        expected = np.argsort(-similarities, axis=1)[:, :k]
+        text_row = {text: row for row, text in enumerate(texts)}
+        found = [[text_row[text] for text in clusters[i]['similar_texts']] for i in sample]
+        result.update(seconds=elapsed, throughput=n / elapsed, unit='texts/s',
+                      recall_at_k=recall_at_k(found, expected))
+
+    else:
+        raise ValueError(f"Unknown benchmark '{benchmark}', expected one of {BENCHMARKS}")
+
+    result['peak_rss_bytes'] = peak_rss_bytes()
+    return result
+
+
+def _case_worker(queue, args):
+    try:
+        queue.put(('ok', run_case(*args)))
+    except Exception as e:
+        queue.put(('error', repr(e)))
+
+
+def run_isolated(*args):
+    """Run one case in a fresh spawned process so its peak RSS is not inherited."""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_case_worker, args=(queue, args))
+    process.start()
+    status, result = queue.get()
+    process.join()
+    if status == 'error':
+        raise RuntimeError(result)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Regression messages for cases that got slower or less accurate than the baseline."""
+    key = lambda r: (r['benchmark'], r['n'], r.get('index_type'))
+    previous = {key(r): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        name = '/'.join(str(part) for part in key(result) if part is not None)
+        if result['throughput'] < old['throughput'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {old['throughput']:.1f} -> {result['throughput']:.1f} {result['unit']}")
+        if 'recall_at_k' in result and result['recall_at_k'] < old.get('recall_at_k', 0) - 0.01:
+            regressions.append(f"{name}: recall@{result['k']} {old['recall_at_k']:.4f} -> {result['recall_at_k']:.4f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--index-types', nargs='+', default=['flat', 'hnsw', 'sq8', 'binary'])
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--threshold', type=float, default=0.7, help="similarity threshold for similar_pairs")
+    parser.add_argument('--max-join-size', type=int, default=100_000,
+                        help="largest corpus for the quadratic similar_pairs and clustering benchmarks")
+    parser.add_argument('--output', help="write JSON results here instead of stdout")
+    parser.add_argument('--baseline', help="earlier JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="allowed throughput drop against the baseline")
+    args = parser.parse_args()
+
+    encoder = StubEncoder()
+    query_embeddings = encoder.encode(query_texts(args.queries))
+    results = []
+    for n in args.sizes:
+        ground_truth = None
+        for benchmark in args.benchmarks:
+            if benchmark in ('similar_pairs', 'clustering'):
+                if n > args.max_join_size:
+                    print(f"skipping {benchmark} at n={n} (above --max-join-size)", file=sys.stderr)
+                    continue
+                index_types = [None]
+            else:
+                index_types = args.index_types
+            if ground_truth is None and benchmark in ('search', 'batch_search'):
+                ground_truth = exact_neighbors(encoder.encode(corpus_texts(n)), query_embeddings, args.k)
+            for index_type in index_types:
+                result = run_isolated(benchmark, n, index_type, args.k, args.queries, args.batch_size,
+                                      args.threshold, ground_truth)
+                results.append(result)
+                line = f"{benchmark:>13} n={n:<8} {index_type or '':<8} {result['throughput']:>12.1f} {result['unit']}"
+                if 'p50_ms' in result:
+                    line += f"  p50 {result['p50_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms"
+                if 'recall_at_k' in result:
+                    line += f"  recall@{args.k} {result['recall_at_k']:.4f}"
+                line += f"  peak RSS {result['peak_rss_bytes'] / 2**20:.0f} MiB"
+                print(line, file=sys.stderr)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'faiss': faiss.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'config': vars(args),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
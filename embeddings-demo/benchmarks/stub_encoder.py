@@ -0,0 +1,51 @@
+"""Deterministic offline stand-in for the sentence-transformer model.
+
+Every text hashes to a cluster centre plus noise, so a synthetic corpus has
+the clustered structure of real embeddings and the same text always gets the
+same vector. Register it before anything encodes:
+
+    from stub_encoder import register_stub_encoder
+    register_stub_encoder()
+"""
+from functools import partial
+import hashlib
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from encoder_registry import DEFAULT_MODEL, get_registry
+
+
+class StubEncoder:
+    def __init__(self, dimension=384, n_clusters=256, noise=1.0, seed=0):
+        """Encoder with the SentenceTransformer encode() interface and no model weights."""
+        self.dimension = dimension
+        self.noise = noise
+        rng = np.random.default_rng(seed)
+        self._centres = rng.standard_normal((n_clusters, dimension)).astype(np.float32)
+        self._noise_pool = rng.standard_normal((4096, dimension)).astype(np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        hashes = np.array([int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+                           for text in sentences], dtype=np.uint64)
+        centre = (hashes % np.uint64(len(self._centres))).astype(np.int64)
+        first = ((hashes >> np.uint64(16)) % np.uint64(len(self._noise_pool))).astype(np.int64)
+        second = ((hashes >> np.uint64(32)) % np.uint64(len(self._noise_pool))).astype(np.int64)
+        # Two pooled noise rows give millions of distinct vectors without a per-text generator
+        noise = (self._noise_pool[first] + self._noise_pool[second]) * np.float32(self.noise / np.sqrt(2))
+        return self._centres[centre] + noise
+
+
+def load_stub_encoder(model_name, **kwargs):
+    return StubEncoder(**kwargs)
+
+
+def register_stub_encoder(model_name=DEFAULT_MODEL, **kwargs):
+    """Make get_encoder(model_name) return a StubEncoder (also in encoder worker processes)."""
+    get_registry().register_loader(model_name, partial(load_stub_encoder, **kwargs))
@@ -0,0 +1,110 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+class AsyncVectorStore:
+    def __init__(self, store, max_batch_size=64, max_wait_ms=5.0, executor=None):
+        """asyncio front-end that micro-batches concurrent queries to a VectorStore.
+
+        Queries wait in a queue until max_batch_size of them have arrived or
+        the oldest has waited max_wait_ms, then they are encoded and searched
+        as one similarity_search_batch call in the executor (by default one
+        worker thread, so the event loop never blocks on the model). Queries
+        in a batch with different k are searched with the largest k and each
+        caller's list is truncated to its own k.
+        """
+        self.store = store
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='vector-search')
+        self._pending = []  # (query, k, nprobe, ef_search, future) in arrival order
+        self._timer = None
+        self.batches = 0
+        self.queries = 0
+
+    async def similarity_search(self, query_text, k=3, nprobe=None, ef_search=None):
+        """Search for the k most similar texts, batched with other concurrent queries."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query_text, k, nprobe, ef_search, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    async def similarity_search_batch(self, queries, k=3, nprobe=None, ef_search=None):
+        """Search several queries, sharing batches with any other concurrent callers."""
+        return list(await asyncio.gather(*(self.similarity_search(query, k, nprobe, ef_search)
+                                           for query in queries)))
+
+    def _flush(self):
+        """Send the queued queries to the executor, max_batch_size at a time."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+            # Queries with different per-query search parameters cannot share a search
+            groups = {}
+            for query, k, nprobe, ef_search, future in batch:
+                if not future.cancelled():
+                    groups.setdefault((nprobe, ef_search), []).append((query, k, future))
+            for (nprobe, ef_search), items in groups.items():
+                max_k = max(k for _, k, _ in items)
+                search = partial(self.store.similarity_search_batch, [query for query, _, _ in items], max_k,
+                                 batch_size=len(items), nprobe=nprobe, ef_search=ef_search)
+                loop.run_in_executor(self._executor, search).add_done_callback(partial(self._deliver, items))
+                self.batches += 1
+                self.queries += len(items)
+
+    @staticmethod
+    def _deliver(items, search):
+        """Hand every waiting caller its own result list, or the batch's exception."""
+        error = search.exception() if not search.cancelled() else asyncio.CancelledError()
+        for i, (_, k, future) in enumerate(items):
+            if future.done():
+                continue  # the caller gave up waiting
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(search.result()[i][:k])
+
+    async def add_texts(self, texts, embeddings=None, ids=None):
+        """add_texts run in the executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(self.store.add_texts, texts, embeddings, ids))
+
+    async def delete(self, ids):
+        """delete run in the executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.store.delete, ids)
+
+    async def upsert(self, ids, texts, embeddings=None):
+        """upsert run in the executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(self.store.upsert, ids, texts, embeddings))
+
+    def stats(self):
+        """Number of batches and queries searched, and the mean batch size."""
+        return {
+            'batches': self.batches,
+            'queries': self.queries,
+            'mean_batch_size': self.queries / self.batches if self.batches else 0.0,
+        }
+
+    async def close(self):
+        """Search any queued queries, then shut down the executor if this object created it."""
+        if self._pending:
+            self._flush()
+        if self._own_executor:
+            await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,48 @@
+import faiss
+import numpy as np
+
+
+def pack_signs(embeddings):
+    """Reduce float embeddings to one sign bit per dimension, packed eight to a byte."""
+    return np.packbits(np.asarray(embeddings) > 0, axis=1)
+
+
+def rerank(query_embeddings, candidates, vectors, k, metric='l2'):
+    """Re-rank candidate rows (-1 = none) by exact distance or score; best k per query.
+
+    vectors is the full float32 matrix, or any callable returning the rows
+    for an array of row numbers.
+    """
+    fetch = vectors if callable(vectors) else lambda rows: np.asarray(vectors[rows], dtype=np.float32)
+    query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+    valid = candidates >= 0
+    candidate_vectors = np.zeros(candidates.shape + (query_embeddings.shape[1],), dtype=np.float32)
+    candidate_vectors[valid] = fetch(candidates[valid])
+    if metric == 'l2':
+        exact = ((candidate_vectors - query_embeddings[:, None, :]) ** 2).sum(axis=2)
+        exact[~valid] = np.inf
+        order = np.argsort(exact, axis=1, kind='stable')[:, :k]
+    else:
+        exact = np.einsum('qcd,qd->qc', candidate_vectors, query_embeddings)
+        exact[~valid] = -np.inf
+        order = np.argsort(-exact, axis=1, kind='stable')[:, :k]
+    indices = np.take_along_axis(candidates, order, 1)
+    distances = np.take_along_axis(exact, order, 1)
+    # Keep FAISS's -1 padding when there were fewer than k candidates
+    indices[~np.take_along_axis(valid, order, 1)] = -1
+    return distances, indices
+
+
+def two_stage_search(embeddings, query_embeddings, k, oversample=10, metric='l2', index=None):
+    """Hamming scan over sign bits for k * oversample candidates, re-ranked with the float vectors.
+
+    Pass a faiss.IndexBinaryFlat already holding pack_signs(embeddings) as
+    index to reuse it across calls. Returns (distances, indices) like FAISS.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+    if index is None:
+        index = faiss.IndexBinaryFlat(embeddings.shape[1])
+        index.add(pack_signs(embeddings))
+    _, candidates = index.search(pack_signs(query_embeddings), k * oversample)
+    return rerank(query_embeddings, candidates, embeddings, k, metric)
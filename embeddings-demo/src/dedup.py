@@ -0,0 +1,181 @@
+import hashlib
+import re
+import unicodedata
+import numpy as np
+
+# MinHash permutations are (a * x + b) mod a Mersenne prime, truncated to 32 bits
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def normalize_text(text):
+    """Case-folded NFKC text with punctuation removed and whitespace collapsed."""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text).split())
+
+
+def shingles(text, size=5):
+    """Set of overlapping character size-grams of a text (the text itself if shorter)."""
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def lsh_bands(threshold, num_perm):
+    """(bands, rows) with bands * rows = num_perm for an LSH index at a Jaccard threshold.
+
+    Takes the most rows per band whose S-curve still steps up below the
+    threshold, so pairs at the threshold are very likely to share a band;
+    false candidates are removed by comparing signatures.
+    """
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    below = [option for option in options if (1 / option[0]) ** (1 / option[1]) <= threshold]
+    return max(below, key=lambda option: option[1]) if below else options[0]
+
+
+class Deduplicator:
+    def __init__(self, threshold=0.8, num_perm=128, shingle_size=5, seed=1):
+        """Detect exact and near-duplicate texts as they are added.
+
+        Exact duplicates share the hash of their normalized text. Near
+        duplicates are found with MinHash signatures of character shingles
+        and locality-sensitive hashing, then confirmed by an estimated
+        Jaccard similarity of at least threshold. Entries are identified by
+        caller-chosen keys (for example VectorStore IDs).
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+
+        self._exact = {}  # normalized text digest -> canonical key
+        self._buckets = [{} for _ in range(self.bands)]  # band of a signature -> canonical keys
+        self._entries = {}  # canonical key -> (digest, signature)
+        self.duplicate_of = {}  # dropped key -> canonical key
+        self._duplicates = {}  # canonical key -> dropped keys
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def fingerprint(self, text):
+        """(digest of the normalized text, MinHash signature) of one text."""
+        normalized = normalize_text(text)
+        digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+        hashes = np.fromiter((int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+                              for shingle in shingles(normalized, self.shingle_size)), dtype=np.uint64)
+        # uint64 products wrap around, as in the usual MinHash implementations
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return digest, permuted.min(axis=0)
+
+    def _band_keys(self, signature):
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def find(self, fingerprint):
+        """Canonical key that a fingerprinted text duplicates, or None if it is new."""
+        digest, signature = fingerprint
+        if digest in self._exact:
+            return self._exact[digest]
+        candidates = set()
+        for band_key, bucket in zip(self._band_keys(signature), self._buckets):
+            candidates.update(bucket.get(band_key, ()))
+        best, best_similarity = None, self.threshold
+        for key in candidates:
+            similarity = float(np.mean(self._entries[key][1] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = key, similarity
+        return best
+
+    def insert(self, key, fingerprint):
+        """Register key as the canonical entry for a fingerprinted text."""
+        digest, signature = fingerprint
+        self._entries[key] = fingerprint
+        self._exact.setdefault(digest, key)
+        for band_key, bucket in zip(self._band_keys(signature), self._buckets):
+            bucket.setdefault(band_key, set()).add(key)
+
+    def mark_duplicate(self, key, canonical, exact=None):
+        """Record that key was dropped as a copy of canonical."""
+        self.duplicate_of[key] = canonical
+        self._duplicates.setdefault(canonical, []).append(key)
+        if exact:
+            self.exact_duplicates += 1
+        else:
+            self.near_duplicates += 1
+
+    def add(self, text, key):
+        """Register a text under key; returns the canonical key it duplicates, or None if kept."""
+        return self.register(key, self.fingerprint(text))
+
+    def register(self, key, fingerprint):
+        """add() for a text that is already fingerprinted."""
+        canonical = self.find(fingerprint)
+        if canonical is None:
+            self.insert(key, fingerprint)
+        else:
+            self.mark_duplicate(key, canonical, exact=self.is_exact(canonical, fingerprint))
+        return canonical
+
+    def is_exact(self, key, fingerprint):
+        """Whether a fingerprinted text has the same normalized text as canonical key."""
+        return self._entries[key][0] == fingerprint[0]
+
+    def canonical(self, key):
+        """The canonical key for key (itself unless it was dropped as a duplicate)."""
+        return self.duplicate_of.get(key, key)
+
+    def duplicates(self, key):
+        """Keys dropped as copies of a canonical key."""
+        return list(self._duplicates.get(key, ()))
+
+    def remove(self, key):
+        """Forget a key; returns the copies that were mapped to it, which are left unmapped."""
+        canonical = self.duplicate_of.pop(key, None)
+        if canonical is not None:
+            self._duplicates[canonical].remove(key)
+            return []
+        if self._remove_entry(key) is None:
+            return []
+        orphans = self._duplicates.pop(key, [])
+        for duplicate in orphans:
+            del self.duplicate_of[duplicate]
+        return orphans
+
+    def promote(self, key, new_key):
+        """Make new_key, a copy of canonical key, the canonical entry in its place; the other copies follow it."""
+        fingerprint = self._remove_entry(key)
+        duplicates = [duplicate for duplicate in self._duplicates.pop(key, []) if duplicate != new_key]
+        del self.duplicate_of[new_key]
+        self.insert(new_key, fingerprint)
+        for duplicate in duplicates:
+            self.duplicate_of[duplicate] = new_key
+        if duplicates:
+            self._duplicates[new_key] = duplicates
+
+    def _remove_entry(self, key):
+        """Drop a canonical entry from the exact and LSH tables; returns its fingerprint or None."""
+        fingerprint = self._entries.pop(key, None)
+        if fingerprint is None:
+            return None
+        digest, signature = fingerprint
+        if self._exact.get(digest) == key:
+            del self._exact[digest]
+        for band_key, bucket in zip(self._band_keys(signature), self._buckets):
+            keys = bucket.get(band_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del bucket[band_key]
+        return fingerprint
+
+    def __contains__(self, key):
+        return key in self._entries or key in self.duplicate_of
+
+    def stats(self):
+        return {
+            'canonical': len(self._entries),
+            'exact_duplicates': self.exact_duplicates,
+            'near_duplicates': self.near_duplicates,
+            'dropped': len(self.duplicate_of),
+        }
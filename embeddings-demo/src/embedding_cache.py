@@ -0,0 +1,130 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'llm_box', 'embeddings.sqlite')
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+# SQLite limits the number of parameters in one statement
+_QUERY_CHUNK = 500
+
+
+def cache_key(model_name, revision, text):
+    """Content address of one embedding: hash of model name, revision and text."""
+    digest = hashlib.sha256()
+    for part in (model_name, revision, text):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.digest()
+
+
+class EmbeddingCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        """Open (or create) an on-disk embedding cache limited to max_bytes of vectors."""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets several processes read while one writes
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS embeddings ('
+            ' key BLOB PRIMARY KEY, vector BLOB NOT NULL,'
+            ' size INTEGER NOT NULL, last_used REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)')
+        self._conn.commit()
+
+    def get_many(self, model_name, revision, texts):
+        """Return a list with the cached float32 vector, or None, for each text."""
+        keys = [cache_key(model_name, revision, text) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _QUERY_CHUNK):
+                chunk = keys[start:start + _QUERY_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT key, vector FROM embeddings WHERE key IN ({placeholders})', chunk
+                ).fetchall()
+                found.update(rows)
+                # Touch hits so eviction removes the least recently used entries
+                if rows:
+                    self._conn.execute(
+                        f'UPDATE embeddings SET last_used = ? WHERE key IN ({",".join("?" * len(rows))})',
+                        [time.time()] + [key for key, _ in rows],
+                    )
+            self._conn.commit()
+
+        vectors = [np.frombuffer(found[key], dtype=np.float32) if key in found else None for key in keys]
+        hits = len(found)
+        self.hits += hits
+        self.misses += len(vectors) - hits
+        return vectors
+
+    def put_many(self, model_name, revision, texts, embeddings):
+        """Store one embedding per text, then evict old entries beyond max_bytes."""
+        now = time.time()
+        rows = []
+        for text, embedding in zip(texts, embeddings):
+            blob = np.ascontiguousarray(embedding, dtype=np.float32).tobytes()
+            rows.append((cache_key(model_name, revision, text), blob, len(blob), now))
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)', rows)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM embeddings').fetchone()[0]
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+        # Free an extra 10% so that every insert does not trigger another eviction
+        excess += self.max_bytes // 10
+        victims = []
+        for key, size in self._conn.execute('SELECT key, size FROM embeddings ORDER BY last_used'):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany('DELETE FROM embeddings WHERE key = ?', victims)
+
+    def size_bytes(self):
+        """Total size of the cached vectors in bytes."""
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM embeddings').fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+
+    def clear(self):
+        """Remove every cached embedding."""
+        with self._lock:
+            self._conn.execute('DELETE FROM embeddings')
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Return the process-wide cache at $EMBEDDING_CACHE_PATH or the default path."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache(os.environ.get('EMBEDDING_CACHE_PATH', DEFAULT_CACHE_PATH))
+        return _default_cache
@@ -0,0 +1,211 @@
+import hashlib
+import os
+import threading
+import time
+
+DEFAULT_MODEL = 'all-MiniLM-L6-v2'
+
+# Interchangeable encoder implementations, all with the SentenceTransformer encode() interface
+BACKENDS = ('torch', 'onnx')
+
+
+def current_rss():
+    """Return the resident set size of this process in bytes (0 if unknown)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if usage > 1 << 32 else usage * 1024
+    except ImportError:
+        return 0
+
+
+def _load_sentence_transformer(model_name):
+    """PyTorch loader: a SentenceTransformer from the Hugging Face hub or cache."""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+def backend_loader(backend):
+    """Loader for an encoder backend: 'torch' (SentenceTransformer) or 'onnx' (int8 ONNX Runtime)."""
+    if backend == 'torch':
+        return _load_sentence_transformer
+    if backend == 'onnx':
+        from onnx_encoder import load_onnx_encoder
+        return load_onnx_encoder
+    raise ValueError(f"Unknown encoder backend '{backend}', expected one of {BACKENDS}")
+
+
+def _load_default(model_name):
+    """Default loader: the backend named by $EMBEDDING_BACKEND, PyTorch if unset."""
+    return backend_loader(os.environ.get('EMBEDDING_BACKEND', 'torch'))(model_name)
+
+
+def _parameter_bytes(model):
+    """Size of the model weights in bytes, if the model exposes parameters()."""
+    if not hasattr(model, 'parameters'):
+        return None
+    return sum(p.numel() * p.element_size() for p in model.parameters())
+
+
+def _weights_digest(model):
+    """sha256 over a model's state_dict() tensor bytes, or None if it has no state_dict()."""
+    if not hasattr(model, 'state_dict'):
+        return None
+    import torch
+    digest = hashlib.sha256()
+    for name, tensor in model.state_dict().items():
+        tensor = tensor.detach().cpu().contiguous().reshape(-1)
+        digest.update(f"{name}:{tensor.dtype}:{tuple(tensor.shape)}".encode('utf-8'))
+        digest.update(tensor.view(torch.uint8).numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+class EncoderRegistry:
+    def __init__(self, loader=None):
+        """Create an empty registry; models are loaded lazily on first use."""
+        self._default_loader = loader or _load_default
+        self._loaders = {}
+        self._models = {}
+        self._revisions = {}
+        self._stats = {}
+        self._model_locks = {}
+        self._lock = threading.Lock()
+
+    def register_loader(self, model_name, loader):
+        """Use a custom loader (a callable taking the model name) for one model."""
+        with self._lock:
+            self._loaders[model_name] = loader
+
+    def use_backend(self, backend, model_name=DEFAULT_MODEL):
+        """Serve model_name from another backend, replacing any copy already loaded."""
+        self.register_loader(model_name, backend_loader(backend))
+        self.unload(model_name)
+
+    def loader(self, model_name=DEFAULT_MODEL):
+        """The custom loader registered for model_name, or None for the default one."""
+        with self._lock:
+            return self._loaders.get(model_name)
+
+    def get(self, model_name=DEFAULT_MODEL):
+        """Return the shared encoder for model_name, loading it once per process."""
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        # One lock per model so that loading one model does not block others
+        with self._lock:
+            model_lock = self._model_locks.setdefault(model_name, threading.Lock())
+            loader = self._loaders.get(model_name, self._default_loader)
+
+        with model_lock:
+            model = self._models.get(model_name)
+            if model is None:
+                rss_before = current_rss()
+                start = time.perf_counter()
+                model = loader(model_name)
+                load_seconds = time.perf_counter() - start
+                self._stats[model_name] = {
+                    'load_seconds': load_seconds,
+                    'rss_delta_bytes': max(current_rss() - rss_before, 0),
+                    'parameter_bytes': _parameter_bytes(model),
+                    'warm': False,
+                }
+                self._models[model_name] = model
+        return model
+
+    def warm_up(self, model_names=(DEFAULT_MODEL,), sample_text="warm-up"):
+        """Load the given models and run one encode so the first query is not slow."""
+        for model_name in model_names:
+            model = self.get(model_name)
+            start = time.perf_counter()
+            model.encode([sample_text])
+            self._stats[model_name]['warm_up_seconds'] = time.perf_counter() - start
+            self._stats[model_name]['warm'] = True
+
+    def revision(self, model_name=DEFAULT_MODEL):
+        """Short fingerprint of the loaded weights, so caches notice a changed model.
+
+        Uses the model's own ``revision`` attribute when it has one, otherwise a
+        hash of its weight tensors; nothing is encoded. Models that expose
+        neither are identified by their class name only.
+        """
+        revision = self._revisions.get(model_name)
+        if revision is None:
+            model = self.get(model_name)
+            revision = getattr(model, 'revision', None) or _weights_digest(model) or type(model).__name__
+            self._revisions[model_name] = revision
+        return revision
+
+    def is_loaded(self, model_name=DEFAULT_MODEL):
+        """Whether model_name has already been loaded in this process."""
+        return model_name in self._models
+
+    def stats(self):
+        """Per-model load time and memory figures, keyed by model name."""
+        return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def unload(self, model_name):
+        """Drop a loaded model so its memory can be reclaimed."""
+        with self._lock:
+            self._models.pop(model_name, None)
+            self._revisions.pop(model_name, None)
+            self._stats.pop(model_name, None)
+
+
+# The process-wide registry shared by every module in this project
+_registry = EncoderRegistry()
+
+
+def get_registry():
+    """Return the process-wide encoder registry."""
+    return _registry
+
+
+def get_encoder(model_name=DEFAULT_MODEL):
+    """Return the shared encoder for model_name from the process-wide registry."""
+    return _registry.get(model_name)
+
+
+def use_backend(backend, model_name=DEFAULT_MODEL):
+    """Switch model_name in the process-wide registry to the 'torch' or 'onnx' backend."""
+    _registry.use_backend(backend, model_name)
+
+
+def model_revision(model_name=DEFAULT_MODEL):
+    """Fingerprint of the weights behind model_name in the process-wide registry."""
+    return _registry.revision(model_name)
+
+
+def warm_up(model_names=(DEFAULT_MODEL,)):
+    """Warm up models in the process-wide registry."""
+    _registry.warm_up(model_names)
+
+
+def model_stats():
+    """Load time and memory figures for every model loaded in this process."""
+    return _registry.stats()
+
+
+def main():
+    print(f"Loading '{DEFAULT_MODEL}'...")
+    warm_up()
+    # A second lookup is served from the registry without reloading
+    start = time.perf_counter()
+    get_encoder()
+    print(f"Second lookup took {time.perf_counter() - start:.6f} seconds")
+    for name, stats in model_stats().items():
+        print(f"\n{name}:")
+        print(f"  load time: {stats['load_seconds']:.2f} s")
+        print(f"  warm-up time: {stats['warm_up_seconds']:.2f} s")
+        print(f"  resident memory added: {stats['rss_delta_bytes'] / 2**20:.1f} MiB")
+        if stats['parameter_bytes'] is not None:
+            print(f"  weights: {stats['parameter_bytes'] / 2**20:.1f} MiB")
+
+if __name__ == "__main__":
+    main()
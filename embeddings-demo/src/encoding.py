@@ -0,0 +1,103 @@
+import numpy as np
+from encoder_registry import DEFAULT_MODEL, get_encoder, model_revision
+from embedding_cache import get_default_cache
+
+
+# Longest input the tokenizer keeps when the model does not say
+DEFAULT_MAX_SEQ_LENGTH = 256
+
+# Most texts one forward pass takes, however short they are
+MAX_BATCH_TEXTS = 512
+
+
+def token_lengths(texts, model):
+    """Token count of each text as the model will see it, capped at its max_seq_length.
+
+    Uses the model's tokenizer when it has one, otherwise estimates from
+    whitespace-separated words.
+    """
+    max_length = getattr(model, 'max_seq_length', None) or DEFAULT_MAX_SEQ_LENGTH
+    tokenizer = getattr(model, 'tokenizer', None)
+    if tokenizer is not None:
+        input_ids = tokenizer(texts, add_special_tokens=True, truncation=True, max_length=max_length,
+                              return_attention_mask=False, return_token_type_ids=False)['input_ids']
+        return np.fromiter((len(ids) for ids in input_ids), dtype=np.int64, count=len(texts))
+    # Roughly 4 word pieces for every 3 words, plus the [CLS] and [SEP] tokens
+    words = np.fromiter((len(text.split()) for text in texts), dtype=np.int64, count=len(texts))
+    return np.minimum(words * 4 // 3 + 2, max_length)
+
+
+def length_bucketed_batches(lengths, max_tokens, max_batch_texts=MAX_BATCH_TEXTS):
+    """Split row indices into batches of similar length, longest first.
+
+    A batch is padded to its longest member, so each batch is filled until
+    its size times its longest length would exceed max_tokens.
+    """
+    order = np.argsort(-np.asarray(lengths), kind='stable')
+    batches, start = [], 0
+    while start < len(order):
+        longest = max(int(lengths[order[start]]), 1)
+        size = min(max(max_tokens // longest, 1), max_batch_texts)
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+
+def _encode_uncached(texts, model_name, batch_size, workers):
+    """Run the model on texts in length-bucketed batches, in worker processes when workers > 1."""
+    model = get_encoder(model_name)
+    if not texts:
+        return np.asarray(model.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+    # Budget the padded tokens of batch_size texts of maximum length per pass,
+    # so short texts share large batches and long ones are not padded further
+    max_tokens = batch_size * (getattr(model, 'max_seq_length', None) or DEFAULT_MAX_SEQ_LENGTH)
+    batches = length_bucketed_batches(token_lengths(texts, model), max_tokens)
+    text_batches = [[texts[i] for i in batch] for batch in batches]
+
+    # Starting a pool only pays off when every worker gets a few batches
+    if workers is not None and workers > 1 and len(texts) >= workers * batch_size:
+        from parallel_encoding import encode_batches_parallel
+        encoded = encode_batches_parallel(text_batches, model_name, workers=workers)
+    else:
+        encoded = np.vstack([np.asarray(model.encode(batch, batch_size=len(batch)), dtype=np.float32)
+                             for batch in text_batches])
+
+    # Put the rows back in input order
+    embeddings = np.empty_like(encoded)
+    embeddings[np.concatenate(batches)] = encoded
+    return embeddings
+
+
+def encode(texts, model_name=DEFAULT_MODEL, cache=None, batch_size=32, workers=None):
+    """Encode texts with the shared model, reusing cached embeddings.
+
+    Only texts missing from the cache are encoded, and are then written back.
+    cache=None uses the process-wide on-disk cache; pass cache=False to
+    always encode. Texts are sorted by token length into batches holding
+    about as many padded tokens as batch_size texts of maximum length, so
+    short texts are not padded to long ones; the output keeps input order.
+    With workers > 1, large inputs are encoded by a pool of worker processes
+    (see parallel_encoding).
+    """
+    texts = list(texts)
+    if cache is None:
+        cache = get_default_cache()
+    model = get_encoder(model_name)
+    if cache is False:
+        return _encode_uncached(texts, model_name, batch_size, workers)
+    if not texts:
+        return np.empty((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    revision = model_revision(model_name)
+    cached = cache.get_many(model_name, revision, texts)
+
+    # Encode each distinct missing text once, even if it repeats in the input
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+    if missing:
+        new_embeddings = _encode_uncached(missing, model_name, batch_size, workers)
+        cache.put_many(model_name, revision, missing, new_embeddings)
+        encoded = dict(zip(missing, new_embeddings))
+        cached = [encoded[text] if vector is None else vector for text, vector in zip(texts, cached)]
+
+    return np.vstack(cached)
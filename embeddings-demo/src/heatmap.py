@@ -0,0 +1,54 @@
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from similarity_join import DEFAULT_BLOCK_SIZE, normalize
+
+
+def cluster_order(embeddings, n_clusters=None, random_state=42):
+    """Row order that groups texts by k-means cluster, so related texts sit next to each other.
+
+    Within a cluster, texts closest to the centroid come first.
+    """
+    normalized = normalize(embeddings)
+    n = len(normalized)
+    if n < 3:
+        return np.arange(n)
+    if n_clusters is None:
+        n_clusters = int(min(50, max(2, np.sqrt(n / 2))))
+    kmeans = MiniBatchKMeans(n_clusters=min(n_clusters, n), random_state=random_state, n_init=3)
+    labels = kmeans.fit_predict(normalized)
+    centroid_similarity = np.einsum('ij,ij->i', normalized, kmeans.cluster_centers_[labels])
+    return np.lexsort((-centroid_similarity, labels))
+
+
+def _bin_starts(bins):
+    """Positions where a non-decreasing array of bin numbers changes value."""
+    return np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+
+
+def pooled_similarity(embeddings, resolution=500, block_size=DEFAULT_BLOCK_SIZE):
+    """Cosine similarity matrix max-pooled down to at most resolution x resolution cells.
+
+    Consecutive rows (and columns) are grouped into equal bins and each cell
+    holds the highest similarity in its block. The full matrix is computed
+    block_size x block_size tiles at a time and never held in memory.
+    """
+    normalized = normalize(embeddings)
+    n = len(normalized)
+    size = min(n, resolution)
+    bins = np.arange(n) * size // n  # output bin of every row and column
+    pooled = np.full((size, size), -np.inf, dtype=np.float32)
+
+    for row_start in range(0, n, block_size):
+        rows = normalized[row_start:row_start + block_size]
+        row_bins = bins[row_start:row_start + block_size]
+        row_starts = _bin_starts(row_bins)
+
+        for col_start in range(0, n, block_size):
+            col_bins = bins[col_start:col_start + block_size]
+            col_starts = _bin_starts(col_bins)
+            tile = rows @ normalized[col_start:col_start + block_size].T
+            tile = np.maximum.reduceat(np.maximum.reduceat(tile, row_starts, axis=0), col_starts, axis=1)
+            # Bins can straddle tile edges, so merge with what earlier tiles found
+            cells = np.ix_(row_bins[row_starts], col_bins[col_starts])
+            pooled[cells] = np.maximum(pooled[cells], tile)
+    return pooled
@@ -0,0 +1,71 @@
+import faiss
+
+# Supported index types, from exact brute force to compressed approximate search
+INDEX_TYPES = ('flat', 'sq_fp16', 'sq8', 'ivf_flat', 'ivf_pq', 'hnsw', 'binary')
+
+
+def factory_string(index_type, nlist=100, pq_m=16, pq_bits=8, hnsw_m=32):
+    """Translate an index type and its build parameters into a FAISS factory string."""
+    if index_type == 'flat':
+        return 'Flat'
+    if index_type == 'sq_fp16':
+        return 'SQfp16'  # float16 codes, half the memory of float32
+    if index_type == 'sq8':
+        return 'SQ8'  # int8 codes with per-dimension ranges learned by train()
+    if index_type == 'ivf_flat':
+        return f'IVF{nlist},Flat'
+    if index_type == 'ivf_pq':
+        return f'IVF{nlist},PQ{pq_m}x{pq_bits}'
+    if index_type == 'hnsw':
+        return f'HNSW{hnsw_m}'
+    if index_type == 'binary':
+        return 'BFlat'  # sign bits scanned by Hamming distance, 32x smaller than float32
+    raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+
+
+def build_index(index_type, dimension, metric=faiss.METRIC_L2, nlist=100, pq_m=16, pq_bits=8,
+                hnsw_m=32, ef_construction=40, nprobe=8, ef_search=64):
+    """Create an empty FAISS index; IVF and sq8 types must be trained before vectors are added.
+
+    nprobe (IVF) and ef_search (HNSW) set the default recall/latency trade-off,
+    which individual queries can override with search_parameters(). 'binary'
+    returns a faiss.IndexBinary over packed sign bits (see binary_codes.pack_signs).
+    """
+    if index_type == 'ivf_pq' and dimension % pq_m != 0:
+        raise ValueError(f"pq_m={pq_m} must divide the dimension {dimension}")
+    if index_type == 'binary':
+        if dimension % 8 != 0:
+            raise ValueError(f"Binary indexes need a dimension divisible by 8, got {dimension}")
+        return faiss.index_binary_factory(dimension, factory_string(index_type))
+
+    index = faiss.index_factory(dimension, factory_string(index_type, nlist, pq_m, pq_bits, hnsw_m), metric)
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = nprobe
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = ef_search
+    return index
+
+
+def search_parameters(index, nprobe=None, ef_search=None, selector=None):
+    """Per-query FAISS search parameters, or None to use the index defaults.
+
+    selector is an optional faiss.IDSelector restricting which IDs may be
+    returned; the caller must keep it alive for the duration of the search.
+    """
+    kwargs = {} if selector is None else {'sel': selector}
+    if isinstance(index, faiss.IndexBinary):
+        return faiss.SearchParameters(**kwargs) if kwargs else None
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        if nprobe is None and not kwargs:
+            return None
+        # Parameter objects do not inherit the index's own setting
+        return faiss.SearchParametersIVF(nprobe=ivf.nprobe if nprobe is None else nprobe, **kwargs)
+    if isinstance(index, faiss.IndexHNSW):
+        if ef_search is None and not kwargs:
+            return None
+        return faiss.SearchParametersHNSW(efSearch=index.hnsw.efSearch if ef_search is None else ef_search, **kwargs)
+    return faiss.SearchParameters(**kwargs) if kwargs else None
@@ -0,0 +1,142 @@
+import os
+import queue
+import threading
+import time
+from encoder_registry import DEFAULT_MODEL
+from encoding import encode
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+def iter_lines(filepath):
+    """Yield (line, bytes read) pairs from a text file without loading it whole."""
+    with open(filepath, 'rb') as f:
+        for raw in f:
+            yield raw.rstrip(b'\r\n').decode('utf-8'), len(raw)
+
+
+def _reader(filepath, batch_size, batches, stop):
+    """Stage 1: read lines lazily and group them into fixed-size batches."""
+    try:
+        batch, batch_bytes = [], 0
+        for line, n_bytes in iter_lines(filepath):
+            if stop.is_set():
+                return
+            batch.append(line)
+            batch_bytes += n_bytes
+            if len(batch) == batch_size:
+                batches.put((batch, batch_bytes))
+                batch, batch_bytes = [], 0
+        if batch:
+            batches.put((batch, batch_bytes))
+        batches.put(_DONE)
+    except BaseException as e:
+        batches.put(e)
+
+
+def _encoder(batches, encoded, store, model_name, stop):
+    """Stage 2: encode each batch while the next one is being read.
+
+    A store that deduplicates drops repeated texts here, so they are never encoded.
+    """
+    try:
+        while not stop.is_set():
+            try:
+                item = batches.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE or isinstance(item, BaseException):
+                encoded.put(item)
+                return
+            texts, n_bytes = item
+            n_read, ids = len(texts), None
+            if getattr(store, 'deduplicator', None) is not None:
+                rows, ids, _ = store.deduplicate(texts)
+                texts = [texts[row] for row in rows]
+            encoded.put((texts, ids, encode(texts, model_name), n_read - len(texts), n_bytes))
+    except BaseException as e:
+        encoded.put(e)
+
+
+def print_progress(progress):
+    """Default progress reporter for stream_ingest."""
+    percent = f" ({progress['percent']:.1f}%)" if progress['percent'] is not None else ""
+    print(f"Indexed {progress['texts']} texts{percent} at {progress['texts_per_second']:.0f} texts/s")
+
+
+def stream_ingest(filepath, store, batch_size=256, queue_size=4, on_batch=None, progress=print_progress,
+                  progress_interval=1.0):
+    """Stream a text file into a vector store one line per text with bounded memory.
+
+    Reading, encoding and index insertion run concurrently, connected by
+    queues of at most queue_size batches, so peak memory depends on
+    batch_size rather than on the corpus size. on_batch(texts, embeddings)
+    is called after each batch is added; progress(dict) at most every
+    progress_interval seconds. Returns the final statistics. With a store
+    that deduplicates, duplicates are dropped before encoding, are left out
+    of on_batch and are counted under 'duplicates'.
+    """
+    total_bytes = os.path.getsize(filepath)
+    batches = queue.Queue(maxsize=queue_size)
+    encoded = queue.Queue(maxsize=queue_size)
+    model_name = getattr(store, 'model_name', DEFAULT_MODEL)
+    stop = threading.Event()
+
+    threads = [
+        threading.Thread(target=_reader, args=(filepath, batch_size, batches, stop), daemon=True),
+        threading.Thread(target=_encoder, args=(batches, encoded, store, model_name, stop), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    stats = {'texts': 0, 'duplicates': 0, 'batches': 0, 'bytes': 0, 'total_bytes': total_bytes}
+    start = last_report = time.perf_counter()
+    try:
+        # Stage 3: insert each encoded batch as soon as it is ready
+        while True:
+            item = encoded.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            texts, ids, embeddings, n_duplicates, n_bytes = item
+            if texts:
+                store.add_texts(texts, embeddings, ids=ids)
+                if on_batch is not None:
+                    on_batch(texts, embeddings)
+
+            stats['texts'] += len(texts)
+            stats['duplicates'] += n_duplicates
+            stats['batches'] += 1
+            stats['bytes'] += n_bytes
+            now = time.perf_counter()
+            if progress is not None and now - last_report >= progress_interval:
+                progress(_progress(stats, now - start))
+                last_report = now
+    finally:
+        # Stop both stages and unblock them if insertion failed part way through
+        stop.set()
+        while any(thread.is_alive() for thread in threads):
+            for q in (batches, encoded):
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+            time.sleep(0.001)
+
+    final = _progress(stats, time.perf_counter() - start)
+    if progress is not None:
+        progress(final)
+    return final
+
+
+def _progress(stats, elapsed):
+    """Throughput and completion figures for the current ingest state."""
+    return dict(
+        stats,
+        seconds=elapsed,
+        texts_per_second=stats['texts'] / elapsed if elapsed > 0 else 0.0,
+        megabytes_per_second=stats['bytes'] / 2**20 / elapsed if elapsed > 0 else 0.0,
+        percent=100.0 * stats['bytes'] / stats['total_bytes'] if stats['total_bytes'] else None,
+    )
@@ -0,0 +1,77 @@
+import faiss
+import numpy as np
+from similarity_join import DEFAULT_BLOCK_SIZE, normalize
+
+
+def knn_graph(embeddings, k=3, block_size=DEFAULT_BLOCK_SIZE, backend='numpy'):
+    """Return (neighbors, similarities), each of shape (n, k), for every row.
+
+    Row i lists the k texts most similar to text i by cosine similarity,
+    best first, never including i itself. The numpy backend keeps a running
+    top-k with argpartition over block_size x block_size tiles, so memory is
+    O(n * k) plus one tile; backend='faiss' queries an inner-product index.
+    """
+    normalized = normalize(embeddings)
+    n = len(normalized)
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.empty((n, 0), dtype=np.int64), np.empty((n, 0), dtype=np.float32)
+    if backend == 'numpy':
+        neighbors, similarities = _numpy_knn(normalized, k, block_size)
+    elif backend == 'faiss':
+        neighbors, similarities = _faiss_knn(normalized, k, block_size)
+    else:
+        raise ValueError(f"Unknown backend '{backend}', expected 'numpy' or 'faiss'")
+
+    # Order each row best first, breaking ties by index
+    order = np.lexsort((neighbors, -similarities), axis=1)
+    return np.take_along_axis(neighbors, order, 1), np.take_along_axis(similarities, order, 1)
+
+
+def _numpy_knn(normalized, k, block_size):
+    n = len(normalized)
+    neighbors = np.empty((n, k), dtype=np.int64)
+    similarities = np.empty((n, k), dtype=np.float32)
+    for row_start in range(0, n, block_size):
+        rows = normalized[row_start:row_start + block_size]
+        best_idx = np.empty((len(rows), 0), dtype=np.int64)
+        best_sim = np.empty((len(rows), 0), dtype=np.float32)
+
+        for col_start in range(0, n, block_size):
+            tile = rows @ normalized[col_start:col_start + block_size].T
+            # Exclude each row from its own neighbour list
+            diagonal = np.arange(len(rows)) + row_start - col_start
+            on_tile = (diagonal >= 0) & (diagonal < tile.shape[1])
+            tile[np.nonzero(on_tile)[0], diagonal[on_tile]] = -np.inf
+
+            # Merge the tile into the running top-k
+            cand_sim = np.hstack([best_sim, tile])
+            cand_idx = np.hstack([best_idx, np.broadcast_to(np.arange(col_start, col_start + tile.shape[1]), tile.shape)])
+            if cand_sim.shape[1] > k:
+                top = np.argpartition(-cand_sim, k - 1, axis=1)[:, :k]
+                cand_sim = np.take_along_axis(cand_sim, top, 1)
+                cand_idx = np.take_along_axis(cand_idx, top, 1)
+            best_sim, best_idx = cand_sim, cand_idx
+
+        neighbors[row_start:row_start + len(rows)] = best_idx
+        similarities[row_start:row_start + len(rows)] = best_sim
+    return neighbors, similarities
+
+
+def _faiss_knn(normalized, k, block_size):
+    index = faiss.IndexFlatIP(normalized.shape[1])
+    index.add(normalized)
+    n = len(normalized)
+    neighbors = np.empty((n, k), dtype=np.int64)
+    similarities = np.empty((n, k), dtype=np.float32)
+    for row_start in range(0, n, block_size):
+        rows = normalized[row_start:row_start + block_size]
+        # Ask for one extra hit, then drop the row itself (or the last hit if it is absent)
+        sims, idx = index.search(rows, k + 1)
+        row_ids = np.arange(row_start, row_start + len(rows))[:, None]
+        is_self = idx == row_ids
+        is_self[~is_self.any(axis=1), -1] = True
+        keep = ~is_self
+        neighbors[row_start:row_start + len(rows)] = idx[keep].reshape(len(rows), k)
+        similarities[row_start:row_start + len(rows)] = sims[keep].reshape(len(rows), k)
+    return neighbors, similarities
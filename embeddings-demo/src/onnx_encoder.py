@@ -0,0 +1,189 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+import numpy as np
+from encoder_registry import DEFAULT_MODEL, _load_sentence_transformer
+
+DEFAULT_ONNX_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'llm_box', 'onnx')
+
+CONFIG_FILE = 'encoder.json'
+FP32_FILE = 'model.onnx'
+INT8_FILE = 'model_int8.onnx'
+
+
+def onnx_model_dir(model_name=DEFAULT_MODEL):
+    """Where the exported graph for model_name lives ($ONNX_MODEL_DIR or ~/.cache/llm_box/onnx)."""
+    root = os.environ.get('ONNX_MODEL_DIR', DEFAULT_ONNX_DIR)
+    return os.path.join(root, model_name.replace('/', '__'))
+
+
+def _pooling_config(model):
+    """Pooling mode and normalization of a SentenceTransformer, as the ONNX encoder applies them."""
+    from sentence_transformers import models
+    pooling = next(module for module in model if isinstance(module, models.Pooling))
+    # sentence-transformers 3-5 expose get_pooling_mode_str(); later versions a pooling_mode attribute
+    mode = pooling.get_pooling_mode_str() if hasattr(pooling, 'get_pooling_mode_str') else pooling.pooling_mode
+    if mode not in ('mean', 'cls'):
+        raise ValueError(f"Pooling mode '{mode}' is not supported by the ONNX encoder")
+    return {
+        'pooling': mode,
+        'normalize': any(isinstance(module, models.Normalize) for module in model),
+        'max_seq_length': model.max_seq_length,
+        'dimension': model.get_sentence_embedding_dimension(),
+    }
+
+
+def export_onnx(model_name=DEFAULT_MODEL, output_dir=None, model=None, quantize=True):
+    """Export a SentenceTransformer's transformer to ONNX, plus a dynamically int8-quantized copy.
+
+    The tokenizer and pooling settings are saved next to the graph so that
+    OnnxEncoder reproduces the model's output without importing torch.
+    """
+    import torch
+    output_dir = output_dir or onnx_model_dir(model_name)
+    model = model or _load_sentence_transformer(model_name)
+    os.makedirs(output_dir, exist_ok=True)
+
+    transformer = model[0].auto_model.eval()
+    model.tokenizer.save_pretrained(output_dir)
+    sample = model.tokenizer(["export sample"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    class _HiddenStates(torch.nn.Module):
+        # Positional inputs in input_names order, returning only the token embeddings
+        def __init__(self):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, *inputs):
+            return self.transformer(**dict(zip(input_names, inputs))).last_hidden_state
+
+    fp32_path = os.path.join(output_dir, FP32_FILE)
+    # Newer torch defaults to the dynamo exporter, which ignores dynamic_axes; older torch has no such option
+    export_options = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(_HiddenStates(), tuple(sample[name] for name in input_names), fp32_path,
+                          input_names=input_names, output_names=['last_hidden_state'],
+                          dynamic_axes=dynamic_axes, opset_version=17, **export_options)
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, os.path.join(output_dir, INT8_FILE), weight_type=QuantType.QInt8)
+
+    config = dict(_pooling_config(model), model_name=model_name, input_names=input_names)
+    with open(os.path.join(output_dir, CONFIG_FILE), 'w') as f:
+        json.dump(config, f, indent=2)
+    return output_dir
+
+
+class OnnxEncoder:
+    def __init__(self, model_dir, quantized=True, n_threads=None):
+        """Encoder running an exported graph on ONNX Runtime, with the SentenceTransformer encode() interface.
+
+        quantized=True runs the int8 graph written by export_onnx, else the
+        float32 one. n_threads limits ONNX Runtime's intra-op thread pool.
+        """
+        import onnxruntime
+        from transformers import AutoTokenizer
+        with open(os.path.join(model_dir, CONFIG_FILE)) as f:
+            self.config = json.load(f)
+        self.max_seq_length = self.config['max_seq_length']
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        graph_path = os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)
+
+        options = onnxruntime.SessionOptions()
+        if n_threads:
+            options.intra_op_num_threads = n_threads
+        self.session = onnxruntime.InferenceSession(graph_path, options, providers=['CPUExecutionProvider'])
+
+        # Cached embeddings are keyed by revision, so each graph gets its own
+        with open(graph_path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:16]
+        self.revision = f"onnx-{'int8' if quantized else 'fp32'}-{digest}"
+
+    def get_sentence_embedding_dimension(self):
+        return self.config['dimension']
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """Embed sentences as a float32 array of shape (n, dimension)."""
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        # Batch texts of similar length together, as SentenceTransformer.encode does
+        order = np.argsort([-len(sentence) for sentence in sentences], kind='stable')
+        outputs = [np.empty((0, self.config['dimension']), dtype=np.float32)]
+        for start in range(0, len(sentences), batch_size):
+            batch = [sentences[i] for i in order[start:start + batch_size]]
+            tokens = self.tokenizer(batch, padding=True, truncation=True, max_length=self.max_seq_length,
+                                    return_tensors='np')
+            feed = {name: tokens[name].astype(np.int64) for name in self.config['input_names']}
+            hidden = self.session.run(['last_hidden_state'], feed)[0]
+            if self.config['pooling'] == 'cls':
+                pooled = hidden[:, 0]
+            else:
+                # Mean over real tokens only, as sentence-transformers pools
+                mask = tokens['attention_mask'][..., None].astype(np.float32)
+                pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            if self.config['normalize']:
+                pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            outputs.append(pooled.astype(np.float32))
+        embeddings = np.empty((len(sentences), self.config['dimension']), dtype=np.float32)
+        embeddings[order] = np.vstack(outputs)
+        return embeddings
+
+
+def load_onnx_encoder(model_name=DEFAULT_MODEL):
+    """Registry loader: the int8 ONNX encoder for model_name, exported on first use."""
+    model_dir = onnx_model_dir(model_name)
+    if not os.path.exists(os.path.join(model_dir, CONFIG_FILE)):
+        export_onnx(model_name, model_dir)
+    # Follow the thread limit that parallel_encoding sets in its workers
+    return OnnxEncoder(model_dir, n_threads=int(os.environ.get('OMP_NUM_THREADS', 0)) or None)
+
+
+def compare_backends(texts, model_name=DEFAULT_MODEL, repeats=3, batch_size=32):
+    """Parity (per-text cosine) and latency of the int8 ONNX encoder against PyTorch."""
+    reference = _load_sentence_transformer(model_name)
+    candidate = load_onnx_encoder(model_name)
+    results = {}
+    for name, model in (('torch', reference), ('onnx_int8', candidate)):
+        model.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            embeddings = np.asarray(model.encode(texts, batch_size=batch_size), dtype=np.float32)
+            timings.append(time.perf_counter() - start)
+        results[name] = {'embeddings': embeddings, 'seconds': min(timings)}
+
+    a, b = results['torch']['embeddings'], results['onnx_int8']['embeddings']
+    cosine = np.einsum('ij,ij->i', a, b) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    return {
+        'texts': len(texts),
+        'min_cosine': float(cosine.min()),
+        'mean_cosine': float(cosine.mean()),
+        'torch_seconds': results['torch']['seconds'],
+        'onnx_int8_seconds': results['onnx_int8']['seconds'],
+        'speedup': results['torch']['seconds'] / results['onnx_int8']['seconds'],
+    }
+
+
+def main():
+    current_dir = os.path.dirname(__file__)
+    data_path = os.path.join(os.path.dirname(current_dir), 'data', 'sample_texts.txt')
+    with open(data_path) as f:
+        texts = f.read().splitlines()
+
+    print(f"Comparing PyTorch and int8 ONNX Runtime encoders for '{DEFAULT_MODEL}'...")
+    report = compare_backends(texts * 20)
+    print(f"Texts encoded: {report['texts']}")
+    print(f"Cosine similarity to PyTorch: min {report['min_cosine']:.4f}, mean {report['mean_cosine']:.4f}")
+    print(f"PyTorch: {report['torch_seconds']:.3f} s, ONNX int8: {report['onnx_int8_seconds']:.3f} s "
+          f"({report['speedup']:.2f}x)")
+    if report['min_cosine'] < 0.99:
+        raise SystemExit("Parity check failed: some embeddings differ from PyTorch (cosine < 0.99)")
+    print("Parity check passed (cosine >= 0.99)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import threading
+import numpy as np
+from encoder_registry import DEFAULT_MODEL, get_encoder, get_registry
+
+# Environment variables read by the OpenMP/BLAS runtimes behind torch and numpy
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def limit_threads(n_threads):
+    """Cap torch, OpenMP and BLAS thread pools in this process at n_threads."""
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(n_threads)
+    # Libraries already loaded have read the environment; set their pools directly
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(n_threads)
+    except ImportError:
+        pass
+    try:
+        import torch
+        torch.set_num_threads(n_threads)
+    except ImportError:
+        pass
+
+
+def _init_worker(model_name, loader, n_threads):
+    """Worker start-up: limit threads, then load this worker's own copy of the model."""
+    limit_threads(n_threads)
+    if loader is not None:
+        get_registry().register_loader(model_name, loader)
+    get_encoder(model_name)
+
+
+def _encode_chunk(model_name, batches):
+    """Encode a list of batches, one forward pass per batch."""
+    model = get_encoder(model_name)
+    return np.vstack([np.asarray(model.encode(batch, batch_size=len(batch)), dtype=np.float32)
+                      for batch in batches])
+
+
+def get_pool(model_name=DEFAULT_MODEL, workers=None, threads_per_worker=None):
+    """Shared pool of encoder worker processes, started on first use and reused afterwards.
+
+    Each worker loads its own model and is limited to threads_per_worker
+    threads (by default the cores divided by the workers), so the pool does
+    not oversubscribe the machine. A custom loader registered for the model
+    is used by the workers too and must therefore be picklable. Pools started
+    with another loader (before use_backend, say) are shut down, so workers
+    always run the model the parent process would.
+    """
+    workers = workers or os.cpu_count()
+    threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    loader = get_registry().loader(model_name)
+    key = (model_name, loader, workers, threads_per_worker)
+    with _pools_lock:
+        for stale in [other for other in _pools if other[0] == model_name and other[1] is not loader]:
+            _pools.pop(stale).shutdown()
+        pool = _pools.get(key)
+        if pool is None:
+            # Spawn rather than fork: forking after torch started threads can deadlock
+            pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(model_name, loader, threads_per_worker),
+            )
+            _pools[key] = pool
+        return pool
+
+
+def encode_batches_parallel(batches, model_name=DEFAULT_MODEL, workers=None, batches_per_chunk=8,
+                            threads_per_worker=None):
+    """Encode lists of texts on a pool of worker processes, one forward pass per list.
+
+    Batches are sent batches_per_chunk at a time, so every worker stays busy
+    while the others' results are collected. Rows come back in the order of
+    the batches and of the texts within them.
+    """
+    pool = get_pool(model_name, workers, threads_per_worker)
+    chunks = [batches[start:start + batches_per_chunk] for start in range(0, len(batches), batches_per_chunk)]
+    # map() yields results in submission order, whichever worker finishes first
+    return np.vstack(list(pool.map(_encode_chunk, [model_name] * len(chunks), chunks)))
+
+
+def shutdown_pools():
+    """Stop every encoder worker pool."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown()
+        _pools.clear()
+
+
+atexit.register(shutdown_pools)
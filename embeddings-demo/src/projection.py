@@ -0,0 +1,134 @@
+import faiss
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import IncrementalPCA
+from sklearn.manifold import TSNE
+from similarity_join import normalize
+
+PROJECTION_METHODS = ('pca', 'tsne', 'umap')
+
+
+def stratified_sample(labels, size, random_state=42):
+    """Indices of about size rows drawn from every label in proportion to its count.
+
+    Each label keeps at least one row, so small groups stay visible.
+    """
+    labels = np.asarray(labels)
+    if len(labels) <= size:
+        return np.arange(len(labels))
+    rng = np.random.default_rng(random_state)
+    _, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    quotas = np.maximum(1, np.round(counts * size / len(labels)).astype(int))
+    chosen = [rng.choice(np.flatnonzero(inverse == group), min(quota, count), replace=False)
+              for group, (quota, count) in enumerate(zip(quotas, counts))]
+    return np.sort(np.concatenate(chosen))
+
+
+def cluster_labels(embeddings, n_clusters=20, sample_size=10000, random_state=42):
+    """Coarse k-means labels for every row, fitted on a random sample of rows."""
+    n = len(embeddings)
+    if n <= n_clusters:
+        return np.arange(n)
+    rng = np.random.default_rng(random_state)
+    sample = rng.choice(n, min(n, sample_size), replace=False)
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state, n_init=3)
+    kmeans.fit(normalize(embeddings[sample]))
+    return np.concatenate([kmeans.predict(normalize(embeddings[start:start + 65536]))
+                           for start in range(0, n, 65536)])
+
+
+def display_sample(embeddings, max_points=5000, labels=None, random_state=42):
+    """Rows to plot: all of them, or a sample stratified by labels (k-means clusters if none)."""
+    if len(embeddings) <= max_points:
+        return np.arange(len(embeddings))
+    if labels is None:
+        labels = cluster_labels(embeddings, random_state=random_state)
+    return stratified_sample(labels, max_points, random_state)
+
+
+class Projector:
+    def __init__(self, method='pca', sample_size=5000, n_neighbors=10, batch_size=4096, random_state=42):
+        """2-D projection that is fitted once and then places new points without refitting.
+
+        'pca' is an IncrementalPCA fitted in batches on a random sample of
+        sample_size rows; more rows can be folded in later with
+        partial_fit(). 'tsne' (Barnes-Hut) and 'umap' (needs umap-learn,
+        approximate neighbours) are fitted on a stratified sample of
+        sample_size rows; every other point is placed at the
+        similarity-weighted mean of its n_neighbors nearest sample points.
+        """
+        if method not in PROJECTION_METHODS:
+            raise ValueError(f"Unknown projection method '{method}', expected one of {PROJECTION_METHODS}")
+        self.method = method
+        self.sample_size = sample_size
+        self.n_neighbors = n_neighbors
+        self.batch_size = batch_size
+        self.random_state = random_state
+        self._pca = None
+        self._anchor_index = None  # inner-product index over the normalized sample
+        self._anchor_points = None  # 2-D coordinates of the sample
+
+    @property
+    def is_fitted(self):
+        return self._pca is not None or self._anchor_index is not None
+
+    def fit(self, embeddings, labels=None):
+        """Fit the projection; labels, if given, stratify the t-SNE/UMAP sample."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.method == 'pca':
+            # Two principal axes are already well determined by a random sample
+            rng = np.random.default_rng(self.random_state)
+            sample = np.sort(rng.choice(len(embeddings), min(len(embeddings), self.sample_size), replace=False))
+            self._pca = IncrementalPCA(n_components=2)
+            self.partial_fit(embeddings[sample])
+            return self
+
+        sample = embeddings[display_sample(embeddings, self.sample_size, labels, self.random_state)]
+        self._anchor_points = self._fit_sample(sample)
+        self._anchor_index = faiss.IndexFlatIP(sample.shape[1])
+        self._anchor_index.add(normalize(sample))
+        return self
+
+    def _fit_sample(self, sample):
+        """Non-linear 2-D layout of the sample rows."""
+        if self.method == 'umap':
+            try:
+                import umap
+            except ImportError:
+                raise ImportError("method='umap' needs the umap-learn package (pip install umap-learn)")
+            reducer = umap.UMAP(n_components=2, n_neighbors=min(15, len(sample) - 1), random_state=self.random_state)
+            return reducer.fit_transform(sample).astype(np.float32)
+        # Barnes-Hut t-SNE costs O(n log n); perplexity must stay below the sample size
+        perplexity = min(30.0, max(1.0, (len(sample) - 1) / 3))
+        tsne = TSNE(n_components=2, perplexity=perplexity, init='pca', random_state=self.random_state)
+        return tsne.fit_transform(sample).astype(np.float32)
+
+    def partial_fit(self, embeddings):
+        """Update a 'pca' projection with more rows, e.g. newly added texts."""
+        if self.method != 'pca':
+            raise ValueError(f"partial_fit is only supported by 'pca', not '{self.method}'")
+        if self._pca is None:
+            self._pca = IncrementalPCA(n_components=2)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        # Equal-sized batches, so no short tail batch falls below n_components rows
+        for batch in np.array_split(embeddings, max(1, len(embeddings) // self.batch_size)):
+            self._pca.partial_fit(batch)
+        return self
+
+    def transform(self, embeddings):
+        """Project rows with the fitted model; returns an (n, 2) float32 array."""
+        if not self.is_fitted:
+            raise ValueError("Projector must be fitted before transform()")
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.method == 'pca':
+            return self._pca.transform(embeddings).astype(np.float32)
+
+        k = min(self.n_neighbors, self._anchor_index.ntotal)
+        similarities, neighbors = self._anchor_index.search(normalize(embeddings), k)
+        # Closer anchors weigh more; an exact match lands on its anchor
+        weights = 1.0 / np.maximum(1.0 - similarities, 1e-6)
+        weights /= weights.sum(axis=1, keepdims=True)
+        return np.einsum('nk,nkd->nd', weights, self._anchor_points[neighbors]).astype(np.float32)
+
+    def fit_transform(self, embeddings, labels=None):
+        return self.fit(embeddings, labels).transform(embeddings)
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+import copy
+import threading
+import time
+import unicodedata
+
+
+def normalize_query(text):
+    """Canonical form of a query for cache lookups: NFKC with whitespace collapsed."""
+    return ' '.join(unicodedata.normalize('NFKC', text).split())
+
+
+class QueryResultCache:
+    def __init__(self, max_entries=1024, ttl_seconds=300.0):
+        """In-memory LRU cache of search results whose entries expire after ttl_seconds.
+
+        ttl_seconds=None keeps entries until they are evicted. Values are
+        copied on the way in and out, so callers may modify what they get.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()  # key -> (stored_at, value), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a copy of the cached value, or None if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds is not None \
+                    and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, key, value):
+        """Store a copy of value, evicting the least recently used entries beyond max_entries."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove every entry; counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Counters and current size, with the hit rate over all lookups."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'entries': len(self._entries),
+        }
@@ -0,0 +1,185 @@
+import heapq
+import multiprocessing
+import os
+import faiss
+import numpy as np
+from encoder_registry import DEFAULT_MODEL
+from encoding import encode
+
+
+def _shard_worker(conn, store_kwargs, omp_threads):
+    """Serve one shard: a VectorStore answering commands sent over a pipe."""
+    # Limit FAISS threads so the shards together do not oversubscribe the cores
+    faiss.omp_set_num_threads(omp_threads)
+    from vector_store import VectorStore
+    store = VectorStore(**store_kwargs)
+
+    while True:
+        command, args = conn.recv()
+        if command == 'close':
+            conn.close()
+            return
+        try:
+            if command == 'train':
+                result = store.train(embeddings=args[0])
+            elif command == 'add':
+                texts, embeddings, ids = args
+                result = store.add_texts(texts, embeddings, ids=ids)
+            elif command == 'search':
+                query_embeddings, k, search_kwargs = args
+                result = store.search_embeddings(query_embeddings, k, **search_kwargs)
+            elif command == 'delete':
+                result = store.delete(args[0])
+            elif command == 'compact':
+                result = store.compact()
+            elif command == 'len':
+                result = len(store)
+            else:
+                raise ValueError(f"Unknown shard command '{command}'")
+            conn.send(('ok', result))
+        except Exception as e:
+            conn.send(('error', e))
+
+
+class ShardedVectorStore:
+    def __init__(self, n_shards=None, dimension=384, model_name=DEFAULT_MODEL, metric='l2',
+                 index_type='flat', threads_per_shard=None, **index_params):
+        """Start n_shards worker processes, each holding one VectorStore shard.
+
+        Texts are routed to shard id % n_shards, so a delete or upsert touches
+        one shard. A query is encoded once here, searched on every shard in
+        parallel and the per-shard top-k lists are merged into a global top-k.
+        """
+        self.n_shards = n_shards or os.cpu_count()
+        self.dimension = dimension
+        self.model_name = model_name
+        self.metric = metric
+        self._next_id = 0
+        if threads_per_shard is None:
+            threads_per_shard = max(1, (os.cpu_count() or 1) // self.n_shards)
+
+        store_kwargs = dict(index_params, dimension=dimension, model_name=model_name,
+                            metric=metric, index_type=index_type)
+        # Spawn rather than fork: forking after FAISS or torch started threads can deadlock
+        context = multiprocessing.get_context('spawn')
+        self._conns = []
+        self._processes = []
+        for _ in range(self.n_shards):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(target=_shard_worker, args=(child_conn, store_kwargs, threads_per_shard),
+                                      daemon=True)
+            process.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+
+    def _call(self, shard_args):
+        """Send one command per shard (a dict shard -> (command, args)) and gather the replies."""
+        for shard, message in shard_args.items():
+            self._conns[shard].send(message)
+        replies = {}
+        errors = []
+        for shard in shard_args:
+            status, result = self._conns[shard].recv()
+            if status == 'error':
+                errors.append(result)
+            replies[shard] = result
+        if errors:
+            raise errors[0]
+        return replies
+
+    def _broadcast(self, command, *args):
+        """Send the same command to every shard, returning replies in shard order."""
+        replies = self._call({shard: (command, args) for shard in range(self.n_shards)})
+        return [replies[shard] for shard in range(self.n_shards)]
+
+    def train(self, texts=None, embeddings=None):
+        """Train every shard's index (IVF types) on the same sample."""
+        if embeddings is None:
+            embeddings = encode(texts, self.model_name)
+        self._broadcast('train', np.asarray(embeddings, dtype=np.float32))
+
+    def add_texts(self, texts, embeddings=None, ids=None):
+        """Add texts, routing each to shard id % n_shards; returns their IDs."""
+        texts = list(texts)
+        if embeddings is None:
+            embeddings = encode(texts, self.model_name)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if ids is None:
+            ids = list(range(self._next_id, self._next_id + len(texts)))
+        ids = [int(i) for i in ids]
+        self._next_id = max(self._next_id, max(ids, default=-1) + 1)
+
+        shard_of = np.array(ids, dtype=np.int64) % self.n_shards
+        messages = {}
+        for shard in range(self.n_shards):
+            rows = np.nonzero(shard_of == shard)[0]
+            if len(rows):
+                messages[shard] = ('add', ([texts[r] for r in rows], embeddings[rows], [ids[r] for r in rows]))
+        self._call(messages)
+        return ids
+
+    def delete(self, ids):
+        """Delete texts by ID on the shards that hold them."""
+        by_shard = {}
+        for id_ in ids:
+            by_shard.setdefault(int(id_) % self.n_shards, []).append(int(id_))
+        replies = self._call({shard: ('delete', (shard_ids,)) for shard, shard_ids in by_shard.items()})
+        return sum(replies.values())
+
+    def upsert(self, ids, texts, embeddings=None):
+        """Replace (or insert) texts under the given IDs."""
+        self.delete(ids)
+        return self.add_texts(texts, embeddings, ids=ids)
+
+    def compact(self):
+        """Compact every shard in parallel; returns the total rows reclaimed."""
+        return sum(self._broadcast('compact'))
+
+    def __len__(self):
+        return sum(self._broadcast('len'))
+
+    def similarity_search(self, query_text, k=3, **search_kwargs):
+        """Search for the k most similar texts across all shards."""
+        return self.similarity_search_batch([query_text], k, **search_kwargs)[0]
+
+    def similarity_search_batch(self, queries, k=3, batch_size=64, **search_kwargs):
+        """Encode all queries once and scatter-gather them over the shards."""
+        if len(queries) == 0:
+            return []
+        query_embeddings = encode(list(queries), self.model_name, cache=False, batch_size=batch_size)
+        return self.search_embeddings(query_embeddings, k, **search_kwargs)
+
+    def search_embeddings(self, query_embeddings, k=3, **search_kwargs):
+        """Search every shard with precomputed query embeddings and merge the top-k lists."""
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.dimension)
+        shard_results = self._broadcast('search', query_embeddings, k, search_kwargs)
+        return [self._merge([shard[q] for shard in shard_results], k) for q in range(len(query_embeddings))]
+
+    def _merge(self, result_lists, k):
+        """Merge per-shard ranked lists into one global top-k, ties broken by ID."""
+        if self.metric == 'l2':
+            key = lambda result: (result['distance'], result['id'])
+        else:
+            key = lambda result: (-result['score'], result['id'])
+        merged = heapq.nsmallest(k, (result for results in result_lists for result in results), key=key)
+        for rank, result in enumerate(merged, 1):
+            result['rank'] = rank
+        return merged
+
+    def close(self):
+        """Stop the shard processes."""
+        for conn in self._conns:
+            try:
+                conn.send(('close', ()))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+        self._conns, self._processes = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,74 @@
+import faiss
+import numpy as np
+
+DEFAULT_BLOCK_SIZE = 1024
+
+
+def normalize(embeddings):
+    """Return float32 copies of the embeddings scaled to unit length."""
+    embeddings = np.array(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    # Leave zero vectors at zero instead of dividing by zero
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+def iter_pair_blocks(embeddings, threshold=0.7, block_size=DEFAULT_BLOCK_SIZE, backend='numpy'):
+    """Yield (i, j, similarity) arrays of all pairs i < j with cosine similarity above threshold.
+
+    Rows are processed block_size at a time, so at most a block_size x
+    block_size similarity tile is held in memory; each yielded block is
+    ordered by i and then j. backend='faiss' uses an inner-product range
+    search instead of dense tiles, which is faster on very large corpora.
+    """
+    normalized = normalize(embeddings)
+    if backend == 'numpy':
+        return _numpy_pair_blocks(normalized, threshold, block_size)
+    if backend == 'faiss':
+        return _faiss_pair_blocks(normalized, threshold, block_size)
+    raise ValueError(f"Unknown backend '{backend}', expected 'numpy' or 'faiss'")
+
+
+def _numpy_pair_blocks(normalized, threshold, block_size):
+    n = len(normalized)
+    for row_start in range(0, n, block_size):
+        rows = normalized[row_start:row_start + block_size]
+        found_i, found_j, found_sims = [], [], []
+
+        # Only tiles on or right of the diagonal hold pairs with i < j
+        for col_start in range(row_start, n, block_size):
+            tile = rows @ normalized[col_start:col_start + block_size].T
+            mask = tile > threshold
+            if col_start == row_start:
+                mask = np.triu(mask, k=1)
+            tile_i, tile_j = np.nonzero(mask)
+            found_i.append(tile_i + row_start)
+            found_j.append(tile_j + col_start)
+            found_sims.append(tile[tile_i, tile_j])
+
+        yield _sorted_block(found_i, found_j, found_sims)
+
+
+def _faiss_pair_blocks(normalized, threshold, block_size):
+    index = faiss.IndexFlatIP(normalized.shape[1])
+    index.add(normalized)
+    for row_start in range(0, len(normalized), block_size):
+        lims, sims, cols = index.range_search(normalized[row_start:row_start + block_size], threshold)
+        rows = np.repeat(np.arange(row_start, row_start + len(lims) - 1), np.diff(lims).astype(np.int64))
+        keep = cols > rows
+        yield _sorted_block([rows[keep]], [cols[keep]], [sims[keep]])
+
+
+def _sorted_block(found_i, found_j, found_sims):
+    """Concatenate per-tile results and order them by (i, j)."""
+    i = np.concatenate(found_i).astype(np.int64)
+    j = np.concatenate(found_j).astype(np.int64)
+    sims = np.concatenate(found_sims)
+    order = np.lexsort((j, i))
+    return i[order], j[order], sims[order]
+
+
+def iter_similar_pairs(embeddings, threshold=0.7, block_size=DEFAULT_BLOCK_SIZE, backend='numpy'):
+    """Yield (i, j, similarity) tuples for every pair i < j above threshold, streaming."""
+    for block_i, block_j, block_sims in iter_pair_blocks(embeddings, threshold, block_size, backend):
+        yield from zip(block_i.tolist(), block_j.tolist(), block_sims.tolist())
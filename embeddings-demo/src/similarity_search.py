@@ -1,84 +1,116 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
+from encoder_registry import get_encoder
+from heatmap import cluster_order, pooled_similarity
+from ingest import print_progress, stream_ingest
+from knn_graph import knn_graph
+from similarity_join import DEFAULT_BLOCK_SIZE, iter_similar_pairs
 from vector_store import VectorStore
-import pandas as pd
 import plotly.express as px
-from sklearn.metrics.pairwise import cosine_similarity
 import os
 
 class SimilaritySearchDemo:
-    def __init__(self):
-        """Initialize the demo with necessary components."""
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.vector_store = VectorStore()
+    def __init__(self, dedup_threshold=None):
+        """Initialize the demo with necessary components.
         
-    def load_and_index_texts(self, filepath):
-        """Load texts and create vector store index."""
-        with open(filepath, 'r') as f:
-            texts = f.read().splitlines()
+        With dedup_threshold set, exact and near-duplicate lines are dropped
+        at ingest time, before they are encoded (see VectorStore).
+        """
+        # Shared with the vector store through the process-wide registry
+        self.model = get_encoder()
+        # Cosine metric: the store returns similarity scores, not L2 distances
+        self.vector_store = VectorStore(metric='cosine', dedup_threshold=dedup_threshold)
+        self._knn_cache = None  # (embeddings, backend, neighbors, similarities)
         
-        # Generate embeddings
-        embeddings = self.model.encode(texts)
+    def load_and_index_texts(self, filepath, batch_size=256):
+        """Load texts and create vector store index; duplicates dropped at ingest are not returned."""
+        texts, batches = [], []
         
-        # Add to vector store
-        self.vector_store.add_texts(texts, embeddings)
+        # Stream the file through the ingest pipeline, keeping what callers need
+        def collect(batch_texts, batch_embeddings):
+            texts.extend(batch_texts)
+            batches.append(batch_embeddings)
+        
+        stream_ingest(filepath, self.vector_store, batch_size=batch_size, on_batch=collect)
+        embeddings = np.vstack(batches) if batches else np.empty((0, self.vector_store.dimension), dtype=np.float32)
         return texts, embeddings
     
-    def find_similar_pairs(self, embeddings, texts, threshold=0.7):
+    def index_file(self, filepath, batch_size=256, progress=print_progress):
+        """Index a text file of any size without keeping texts or embeddings in memory."""
+        return stream_ingest(filepath, self.vector_store, batch_size=batch_size, progress=progress)
+    
+    def find_similar_pairs(self, embeddings, texts, threshold=0.7, block_size=DEFAULT_BLOCK_SIZE, backend='numpy'):
         """Find all pairs of texts with similarity above threshold."""
-        # Calculate similarity matrix
-        similarity_matrix = cosine_similarity(embeddings)
-        
-        # Find pairs above threshold
-        similar_pairs = []
-        for i in range(len(texts)):
-            for j in range(i + 1, len(texts)):
-                if similarity_matrix[i][j] > threshold:
-                    similar_pairs.append({
-                        'text1': texts[i],
-                        'text2': texts[j],
-                        'similarity': similarity_matrix[i][j]
-                    })
-        
-        return similar_pairs
+        return list(self.iter_similar_pairs(embeddings, texts, threshold, block_size, backend))
     
-    def create_similarity_heatmap(self, embeddings, texts):
-        """Create and save a similarity heatmap visualization."""
-        similarity_matrix = cosine_similarity(embeddings)
-        
-        # Create DataFrame for heatmap
-        df = pd.DataFrame(similarity_matrix, columns=range(len(texts)))
+    def iter_similar_pairs(self, embeddings, texts, threshold=0.7, block_size=DEFAULT_BLOCK_SIZE, backend='numpy'):
+        """Stream pairs of texts with similarity above threshold without a full similarity matrix.
         
-        # Create heatmap
-        fig = px.imshow(
-            similarity_matrix,
-            labels=dict(x="Text Index", y="Text Index", color="Cosine Similarity"),
-            title="Text Similarity Heatmap"
-        )
+        backend='faiss' uses a FAISS range search, which suits very large corpora.
+        """
+        for i, j, similarity in iter_similar_pairs(embeddings, threshold, block_size, backend):
+            yield {
+                'text1': texts[i],
+                'text2': texts[j],
+                'similarity': similarity
+            }
+    
+    def create_similarity_heatmap(self, embeddings, texts, resolution=500, label_threshold=50, max_texts=20000):
+        """Create and save a similarity heatmap visualization.
         
-        # Add text labels
-        fig.update_traces(text=np.round(similarity_matrix, 2), texttemplate="%{text}")
+        Up to label_threshold texts, every pair gets a cell with its similarity
+        written in it. Larger corpora are ordered by cluster, so topics show up
+        as bright blocks along the diagonal, and max-pooled to at most
+        resolution x resolution cells; above max_texts a random sample is
+        plotted. Generation time and file size stay bounded at any corpus size.
+        """
+        embeddings = np.asarray(embeddings)
+        if len(texts) <= label_threshold:
+            similarity_matrix = pooled_similarity(embeddings, resolution=len(texts))
+            fig = px.imshow(
+                similarity_matrix,
+                labels=dict(x="Text Index", y="Text Index", color="Cosine Similarity"),
+                title="Text Similarity Heatmap"
+            )
+            
+            # Add text labels
+            fig.update_traces(text=np.round(similarity_matrix, 2), texttemplate="%{text}")
+        else:
+            if len(embeddings) > max_texts:
+                sample = np.sort(np.random.default_rng(42).choice(len(embeddings), max_texts, replace=False))
+                embeddings = embeddings[sample]
+            order = cluster_order(embeddings)
+            pooled = pooled_similarity(embeddings[order], resolution)
+            fig = px.imshow(
+                pooled,
+                labels=dict(x="Texts (cluster order)", y="Texts (cluster order)", color="Max Cosine Similarity"),
+                title=f"Text Similarity Heatmap ({len(embeddings)} texts, max-pooled to {len(pooled)}x{len(pooled)})"
+            )
         
         # Save visualization in the script's directory
         output_path = os.path.join(os.path.dirname(__file__), "similarity_heatmap.html")
         fig.write_html(output_path)
         print(f"Heatmap saved as '{output_path}'")
     
-    def semantic_clustering(self, embeddings, texts, n_neighbors=3):
+    def knn_graph(self, embeddings, n_neighbors=3, backend='numpy'):
+        """Each text's most similar neighbours, computed once and reused across analyses."""
+        cached = self._knn_cache
+        if cached is not None and cached[0] is embeddings and cached[1] == backend and cached[2].shape[1] >= n_neighbors:
+            return cached[2][:, :n_neighbors], cached[3][:, :n_neighbors]
+        neighbors, similarities = knn_graph(embeddings, n_neighbors, backend=backend)
+        self._knn_cache = (embeddings, backend, neighbors, similarities)
+        return neighbors, similarities
+    
+    def semantic_clustering(self, embeddings, texts, n_neighbors=3, backend='numpy'):
         """Find semantic clusters in the texts."""
-        # Calculate similarity matrix
-        similarity_matrix = cosine_similarity(embeddings)
+        # For each text, its most similar neighbors (excluding self) from the kNN graph
+        neighbors, similarities = self.knn_graph(embeddings, n_neighbors, backend)
         
-        # For each text, find its most similar neighbors
         clusters = []
         for i in range(len(texts)):
-            # Get indices of most similar texts (excluding self)
-            similar_indices = np.argsort(similarity_matrix[i])[::-1][1:n_neighbors+1]
-            
             cluster = {
                 'center_text': texts[i],
-                'similar_texts': [texts[j] for j in similar_indices],
-                'similarities': [similarity_matrix[i][j] for j in similar_indices]
+                'similar_texts': [texts[j] for j in neighbors[i]],
+                'similarities': similarities[i].tolist()
             }
             clusters.append(cluster)
         
@@ -126,7 +158,7 @@ def main():
     print(f"\nQuery: {query}")
     print("Most similar texts:")
     for result in results:
-        print(f"{result['rank']}. {result['text']} (distance: {result['distance']:.4f})")
+        print(f"{result['rank']}. {result['text']} (similarity: {result['score']:.4f})")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import shutil
+import faiss
+import numpy as np
+from text_store import TextStore
+
+# Bump whenever the on-disk layout changes so old snapshots are rejected
+FORMAT_VERSION = 4
+
+HEADER_FILE = 'header.json'
+INDEX_FILE = 'index.faiss'
+TEXTS_FILE = 'texts.bin'
+OFFSETS_FILE = 'offsets.npy'
+
+
+def model_fingerprint(model_name, dimension):
+    """Identify the embedding space a snapshot's vectors were produced in.
+
+    Only the model name and dimension, so checking it never loads the model;
+    the weights revision is stored separately and checked on the first encode.
+    """
+    description = json.dumps({'model_name': model_name, 'dimension': dimension}, sort_keys=True)
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+
+def write_snapshot(path, index, texts, header, arrays=None, files=None):
+    """Write index, TextStore, named numpy arrays, extra files and header into the snapshot directory.
+
+    files maps a file name inside the snapshot to the path it is copied from.
+    """
+    os.makedirs(path, exist_ok=True)
+
+    # Remove the old header first so a half-written snapshot is never accepted
+    header_path = os.path.join(path, HEADER_FILE)
+    if os.path.exists(header_path):
+        os.remove(header_path)
+
+    index_path = os.path.join(path, INDEX_FILE)
+    if isinstance(index, faiss.IndexBinary):
+        faiss.write_index_binary(index, index_path + '.tmp')
+    else:
+        faiss.write_index(index, index_path + '.tmp')
+    os.replace(index_path + '.tmp', index_path)
+
+    # Texts go into one contiguous UTF-8 buffer; offsets[i]:offsets[i + 1] is text i
+    texts_path = os.path.join(path, TEXTS_FILE)
+    offsets_path = os.path.join(path, OFFSETS_FILE)
+    texts.save(texts_path + '.tmp', offsets_path + '.tmp')
+    os.replace(texts_path + '.tmp', texts_path)
+    os.replace(offsets_path + '.tmp', offsets_path)
+
+    arrays = arrays or {}
+    for name, array in arrays.items():
+        array_path = os.path.join(path, f'{name}.npy')
+        with open(array_path + '.tmp', 'wb') as f:
+            np.save(f, array)
+        os.replace(array_path + '.tmp', array_path)
+
+    for name, source_path in (files or {}).items():
+        target_path = os.path.join(path, name)
+        # The source may be a file of this same snapshot, so copy before replacing
+        if os.path.abspath(source_path) != os.path.abspath(target_path):
+            shutil.copyfile(source_path, target_path + '.tmp')
+            os.replace(target_path + '.tmp', target_path)
+
+    header = dict(header, format_version=FORMAT_VERSION, count=len(texts), arrays=sorted(arrays))
+    with open(header_path + '.tmp', 'w') as f:
+        json.dump(header, f, indent=2)
+    os.replace(header_path + '.tmp', header_path)
+
+
+def read_header(path):
+    """Read and version-check a snapshot header."""
+    header_path = os.path.join(path, HEADER_FILE)
+    if not os.path.exists(header_path):
+        raise ValueError(f"No complete snapshot found at '{path}'")
+    with open(header_path) as f:
+        header = json.load(f)
+    if header.get('format_version') != FORMAT_VERSION:
+        raise ValueError(
+            f"Snapshot format version {header.get('format_version')} is not supported "
+            f"(expected {FORMAT_VERSION})"
+        )
+    return header
+
+
+def read_snapshot(path, expected_fingerprint, mmap=True):
+    """Open a snapshot, rejecting it unless it was built with the expected model."""
+    header = read_header(path)
+    if header.get('model_fingerprint') != expected_fingerprint:
+        raise ValueError(
+            f"Snapshot at '{path}' was built with model '{header.get('model_name')}' "
+            f"(dimension {header.get('dimension')}) "
+            f"and does not match the current model"
+        )
+
+    index_path = os.path.join(path, INDEX_FILE)
+    read_index = faiss.read_index_binary if header.get('index_type') == 'binary' else faiss.read_index
+    if mmap:
+        # Map flat vector storage from the page cache so workers share it
+        io_flags = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP)
+        try:
+            index = read_index(index_path, io_flags)
+        except RuntimeError:
+            index = read_index(index_path)
+    else:
+        index = read_index(index_path)
+
+    texts = TextStore.open(os.path.join(path, TEXTS_FILE), os.path.join(path, OFFSETS_FILE), mmap=mmap)
+
+    if index.ntotal != header['count'] or len(texts) != header['count']:
+        raise ValueError(f"Snapshot at '{path}' is inconsistent: expected {header['count']} entries")
+
+    # Small per-row arrays (IDs, tombstones) are read into memory
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'))
+              for name in header['arrays']}
+
+    return header, index, texts, arrays
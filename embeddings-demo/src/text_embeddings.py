@@ -1,33 +1,55 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
+from encoder_registry import DEFAULT_MODEL, get_encoder
+from encoding import encode
+from projection import Projector, display_sample
+from similarity_join import normalize
 import torch
 import plotly.express as px
 import pandas as pd
-from sklearn.decomposition import PCA
 import os
 
 class TextEmbeddingDemo:
-    def __init__(self, model_name='all-MiniLM-L6-v2'):
+    def __init__(self, model_name=DEFAULT_MODEL):
         """Initialize with a pre-trained sentence transformer model."""
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.model = get_encoder(model_name)
+        self.projector = None  # fitted 2-D projection, reused across visualizations
         
-    def generate_embeddings(self, texts):
-        """Generate embeddings for a list of texts."""
-        return self.model.encode(texts)
+    def generate_embeddings(self, texts, normalize_embeddings=False, workers=None):
+        """Generate embeddings for a list of texts, optionally scaled to unit length.
+        
+        workers > 1 spreads a large batch over that many encoder processes.
+        """
+        # Texts already in the embedding cache are not encoded again
+        embeddings = encode(texts, self.model_name, workers=workers)
+        # Unit-length vectors make the dot product equal to cosine similarity
+        return normalize(embeddings) if normalize_embeddings else embeddings
     
-    def visualize_embeddings(self, embeddings, texts, title="Text Embeddings Visualization"):
-        """Visualize embeddings in 2D using PCA."""
-        # Reduce dimensions to 2D for visualization
-        pca = PCA(n_components=2)
-        embeddings_2d = pca.fit_transform(embeddings)
+    def visualize_embeddings(self, embeddings, texts, title="Text Embeddings Visualization",
+                             method='pca', max_points=5000, labels=None, refit=False):
+        """Visualize embeddings in 2D using PCA (or method='tsne' / 'umap').
+        
+        The projection is fitted on the first call and reused afterwards, so
+        texts added to a growing corpus are placed without refitting (pass
+        refit=True to start over). At most max_points texts are plotted,
+        sampled across labels (or k-means clusters) so every group shows up.
+        """
+        embeddings = np.asarray(embeddings)
+        if refit or self.projector is None or self.projector.method != method:
+            self.projector = Projector(method).fit(embeddings, labels)
+        
+        # Reduce dimensions to 2D for a stratified sample of the texts
+        shown = display_sample(embeddings, max_points, labels)
+        embeddings_2d = self.projector.transform(embeddings[shown])
         
         # Create a DataFrame for plotting
-        df = pd.DataFrame(embeddings_2d, columns=['PC1', 'PC2'])
-        df['text'] = texts
+        axes = ['PC1', 'PC2'] if method == 'pca' else ['Dim1', 'Dim2']
+        df = pd.DataFrame(embeddings_2d, columns=axes)
+        df['text'] = [texts[i] for i in shown]
         
         # Create interactive scatter plot
         fig = px.scatter(
-            df, x='PC1', y='PC2', 
+            df, x=axes[0], y=axes[1], 
             hover_data=['text'],
             title=title
         )
@@ -49,9 +71,9 @@ def main():
     with open(data_path, 'r') as f:
         texts = f.read().splitlines()
     
-    # Generate embeddings
+    # Generate embeddings, normalized once so similarities are plain dot products
     print("Generating embeddings...")
-    embeddings = demo.generate_embeddings(texts)
+    embeddings = demo.generate_embeddings(texts, normalize_embeddings=True)
     
     # Print embedding information
     print(f"\nEmbedding shape: {embeddings.shape}")
@@ -61,8 +83,7 @@ def main():
     text1_idx = 0  # "Machine learning is a subset of artificial intelligence"
     text2_idx = 1  # "AI systems can learn from experience and improve over time"
     
-    similarity = np.dot(embeddings[text1_idx], embeddings[text2_idx]) / \
-                (np.linalg.norm(embeddings[text1_idx]) * np.linalg.norm(embeddings[text2_idx]))
+    similarity = np.dot(embeddings[text1_idx], embeddings[text2_idx])
     
     print(f"\nSimilarity between first two texts: {similarity:.4f}")
     
@@ -0,0 +1,90 @@
+from array import array
+import numpy as np
+
+
+class TextStore:
+    def __init__(self, texts=()):
+        """Texts kept as UTF-8 bytes in one contiguous buffer plus an offsets array.
+
+        Text i is data[offsets[i]:offsets[i + 1]], so a million short texts
+        cost roughly their encoded size instead of one Python object each.
+        Texts are decoded only when read. A store opened from disk keeps the
+        saved texts in a read-only (optionally memory-mapped) segment and
+        appends new texts to an in-memory tail.
+        """
+        self._base_data = np.empty(0, dtype=np.uint8)
+        self._base_offsets = np.zeros(1, dtype=np.int64)
+        self._data = bytearray()
+        self._offsets = array('q', [0])
+        self.extend(texts)
+
+    @classmethod
+    def open(cls, data_path, offsets_path, mmap=True):
+        """Open texts written by save(), memory-mapped unless mmap=False."""
+        store = cls()
+        store._base_offsets = np.load(offsets_path, mmap_mode='r' if mmap else None)
+        if store._base_offsets[-1] == 0:
+            pass  # np.memmap cannot map an empty file
+        elif mmap:
+            store._base_data = np.memmap(data_path, dtype=np.uint8, mode='r')
+        else:
+            store._base_data = np.fromfile(data_path, dtype=np.uint8)
+        return store
+
+    def save(self, data_path, offsets_path):
+        """Write the texts as one UTF-8 file plus an .npy offsets file."""
+        n_base = len(self._base_offsets) - 1
+        base_bytes = int(self._base_offsets[-1])
+        with open(data_path, 'wb') as f:
+            f.write(memoryview(self._base_data[:base_bytes]))
+            f.write(self._data)
+        tail_offsets = np.frombuffer(self._offsets, dtype=np.int64)[1:] + base_bytes
+        offsets = np.concatenate([self._base_offsets[:n_base + 1], tail_offsets])
+        with open(offsets_path, 'wb') as f:
+            np.save(f, offsets)
+
+    def __len__(self):
+        return len(self._base_offsets) - 1 + len(self._offsets) - 1
+
+    def _raw(self, idx):
+        """Encoded bytes of text idx."""
+        n_base = len(self._base_offsets) - 1
+        if idx < n_base:
+            return bytes(self._base_data[self._base_offsets[idx]:self._base_offsets[idx + 1]])
+        idx -= n_base
+        return bytes(self._data[self._offsets[idx]:self._offsets[idx + 1]])
+
+    def __getitem__(self, idx):
+        idx = int(idx)
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("text index out of range")
+        return self._raw(idx).decode('utf-8')
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self._raw(idx).decode('utf-8')
+
+    def append(self, text):
+        self._data += text.encode('utf-8')
+        self._offsets.append(len(self._data))
+
+    def extend(self, texts):
+        for text in texts:
+            self.append(text)
+
+    def take(self, rows):
+        """New in-memory TextStore holding the given rows, copied without decoding."""
+        store = TextStore()
+        for row in rows:
+            store._data += self._raw(int(row))
+            store._offsets.append(len(store._data))
+        return store
+
+    @property
+    def nbytes(self):
+        """Bytes used by text data and offsets held in memory (mapped pages excluded)."""
+        mapped = isinstance(self._base_data, np.memmap)
+        base = 0 if mapped else self._base_data.nbytes + self._base_offsets.nbytes
+        return base + len(self._data) + self._offsets.itemsize * len(self._offsets)
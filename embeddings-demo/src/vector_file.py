@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+
+
+def _temporary_path(directory=None):
+    fd, path = tempfile.mkstemp(suffix='.f32', dir=directory)
+    os.close(fd)
+    return path
+
+
+class VectorFile:
+    def __init__(self, dimension, path=None, read_only=False, directory=None):
+        """Append-only float32 matrix stored in a file and read through a memory map.
+
+        Without a path the vectors go to a new temporary file in directory
+        (the system temporary directory by default, which may be RAM-backed).
+        A read-only file (for example one inside a snapshot) is copied to a
+        temporary file the first time vectors are appended.
+        """
+        self.dimension = dimension
+        self.directory = directory
+        self._owned = path is None  # temporary files are removed with this object
+        if path is None:
+            path = _temporary_path(directory)
+        self.path = path
+        self.read_only = read_only
+        self._row_bytes = dimension * np.dtype(np.float32).itemsize
+        self._map = None
+
+    def __len__(self):
+        return os.path.getsize(self.path) // self._row_bytes
+
+    def _mapped(self):
+        """Memory map of the whole file, re-created after appends."""
+        n_rows = len(self)
+        if self._map is None or len(self._map) != n_rows:
+            if n_rows == 0:
+                # np.memmap cannot map an empty file
+                self._map = np.empty((0, self.dimension), dtype=np.float32)
+            else:
+                self._map = np.memmap(self.path, dtype=np.float32, mode='r', shape=(n_rows, self.dimension))
+        return self._map
+
+    def append(self, vectors):
+        """Append rows to the end of the file."""
+        if self.read_only:
+            path = _temporary_path(self.directory)
+            shutil.copyfile(self.path, path)
+            self.path, self.read_only, self._owned, self._map = path, False, True, None
+        with open(self.path, 'ab') as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+
+    def rows(self, indices):
+        """Read the given rows into memory as a float32 array."""
+        return np.asarray(self._mapped()[indices], dtype=np.float32)
+
+    def take(self, indices, chunk_size=65536):
+        """Write the given rows, in order, to a new temporary VectorFile."""
+        new_file = VectorFile(self.dimension, directory=self.directory)
+        indices = np.asarray(indices, dtype=np.int64)
+        for start in range(0, len(indices), chunk_size):
+            new_file.append(self.rows(indices[start:start + chunk_size]))
+        return new_file
+
+    def copy_to(self, path):
+        """Copy the vectors to path."""
+        shutil.copyfile(self.path, path)
+
+    def __del__(self):
+        if getattr(self, '_owned', False):
+            self._map = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
@@ -1,71 +1,587 @@
+from array import array
+import threading
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from encoder_registry import DEFAULT_MODEL, model_revision
+from encoding import encode
+from index_factory import build_index, search_parameters
+from binary_codes import pack_signs, rerank
+from result_cache import QueryResultCache, normalize_query
+from dedup import Deduplicator
+from text_store import TextStore
+from vector_file import VectorFile
+import snapshot
 import os
 
+# Full-precision vectors kept next to a quantized index for rescoring
+VECTORS_FILE = 'vectors.f32'
+
+# Supported metrics and the FAISS metric each one searches with
+METRICS = {
+    'l2': faiss.METRIC_L2,
+    'cosine': faiss.METRIC_INNER_PRODUCT,  # inner product of unit-length vectors
+    'ip': faiss.METRIC_INNER_PRODUCT,
+}
+
 class VectorStore:
-    def __init__(self, dimension=384):  # default dimension for 'all-MiniLM-L6-v2'
-        """Initialize FAISS index with specified dimensions."""
+    def __init__(self, dimension=384, model_name=DEFAULT_MODEL, index_type='flat', metric='l2',
+                 rescore=False, rescore_factor=None, query_cache_size=0, query_cache_ttl=300.0,
+                 dedup_threshold=None, rescore_dir=None, **index_params):  # default dimension for 'all-MiniLM-L6-v2'
+        """Initialize FAISS index with specified dimensions.
+        
+        index_type: 'flat', 'sq_fp16', 'sq8', 'ivf_flat', 'ivf_pq', 'hnsw' or 'binary'; index_params go to build_index.
+        metric: 'l2' (results carry a 'distance') or 'cosine' / 'ip' (results carry a 'score').
+        rescore, rescore_factor: re-rank k * rescore_factor candidates with exact vectors (always on for 'binary').
+        rescore_dir: directory for the exact vectors' file (default: the system temporary directory).
+        query_cache_size, query_cache_ttl: cache search results until they expire or the store changes.
+        dedup_threshold: drop exact and near-duplicate texts (MinHash Jaccard >= threshold) before encoding.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {tuple(METRICS)}")
         self.dimension = dimension
-        self.index = faiss.IndexFlatL2(dimension)  # L2 distance for similarity
-        self.texts = []  # Store original texts
+        self.model_name = model_name
+        self.index_type = index_type
+        self.metric = metric
+        self.index_params = index_params  # saved in snapshots so load() rebuilds the same index
+        self.index = build_index(index_type, dimension, metric=METRICS[metric], **index_params)
+        self.texts = TextStore()  # Original texts as compact UTF-8, one per index row
+        self._index_mapped = False  # True while the index is a read-only file mapping
+        self._binary = index_type == 'binary'  # index holds packed sign bits, not floats
+        self.rescore_factor = rescore_factor or (10 if self._binary else 4)
+        # Exact vectors for rescoring; the only float copy a binary index has
+        self._raw_vectors = VectorFile(dimension, directory=rescore_dir) if rescore or self._binary else None
+        
+        # Index rows are positional; stable external IDs are mapped onto them
+        self._row_ids = array('q')  # row -> external ID
+        self._id_to_row = {}  # external ID -> row, live rows only
+        self._tombstones = set()  # deleted rows still present in the index
+        self._next_id = 0
+        self._selector = None  # cached FAISS selector excluding tombstoned rows
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()  # one compaction at a time
+        self._version = 0  # bumped by every change to the searchable contents
+        self.query_cache = QueryResultCache(query_cache_size, query_cache_ttl) if query_cache_size else None
+        self.deduplicator = Deduplicator(dedup_threshold) if dedup_threshold is not None else None
+        self._reserved = set()  # IDs kept by deduplicate() and not yet added
+        self._duplicate_texts = {}  # near-duplicate ID -> its own text, for promotion
+        self.model_revision = None  # revision of the weights the stored vectors came from, once known
         
-    def add_texts(self, texts, embeddings=None):
-        """Add texts and their embeddings to the store."""
+    def __len__(self):
+        """Number of live (not deleted) texts."""
+        return len(self._id_to_row)
+    
+    @property
+    def is_trained(self):
+        """Whether the index is ready for add_texts (always true for flat and HNSW)."""
+        return self.index.is_trained
+    
+    def train(self, texts=None, embeddings=None):
+        """Train the index (IVF types) on a representative sample of texts or embeddings."""
         if embeddings is None:
-            model = SentenceTransformer('all-MiniLM-L6-v2')
-            embeddings = model.encode(texts)
+            embeddings = self._encode(texts)
+        with self._lock:
+            self._ensure_writable()
+            self.index.train(self._codes(self._prepare(embeddings)))
+            self._invalidate()
+    
+    def _encode(self, texts, **kwargs):
+        """encode() with this store's model, refusing weights other than the ones its vectors came from."""
+        revision = model_revision(self.model_name)
+        if self.model_revision is None:
+            self.model_revision = revision
+        elif revision != self.model_revision:
+            raise ValueError(
+                f"Model '{self.model_name}' now resolves to revision {revision}, but the stored "
+                f"vectors were built with revision {self.model_revision}"
+            )
+        return encode(texts, self.model_name, **kwargs)
+    
+    def add_texts(self, texts, embeddings=None, ids=None, workers=None):
+        """Add texts and their embeddings to the store and return their IDs.
+        
+        IDs are assigned sequentially unless given; adding an ID that is
+        already present raises ValueError (use upsert to replace it).
+        workers > 1 encodes a large batch of texts on that many processes.
+        With deduplication on, duplicates are dropped before encoding but
+        still get their IDs, mapped to the canonical entry.
+        """
+        if not self.is_trained:
+            raise ValueError(f"The '{self.index_type}' index must be trained with train() before adding texts")
+        texts = list(texts)
+        if self.deduplicator is not None and not self._is_reserved(ids):
+            rows, kept_ids, ids = self.deduplicate(texts, ids)
+            self._add_deduplicated(texts, embeddings, rows, kept_ids, workers)
+            return ids
+        if embeddings is None:
+            embeddings = self._encode(texts, workers=workers)
             
-        # Convert to float32 (required by FAISS)
-        embeddings = embeddings.astype(np.float32)
+        # Convert to float32 (required by FAISS), normalized for cosine
+        embeddings = self._prepare(embeddings)
         
-        # Add to FAISS index
-        self.index.add(embeddings)
-        # Store original texts
-        self.texts.extend(texts)
+        with self._lock:
+            reserved = self._is_reserved(ids)
+            ids = self._assign_ids(texts, ids, reserved)
+            self._reserved.difference_update(ids)
+            self._ensure_writable()
+            first_row = self.index.ntotal
+            
+            # Add to FAISS index
+            self.index.add(self._codes(embeddings))
+            if self._raw_vectors is not None:
+                self._raw_vectors.append(embeddings)
+            # Store original texts and their IDs
+            self.texts.extend(texts)
+            self._row_ids.extend(ids)
+            self._id_to_row.update(zip(ids, range(first_row, first_row + len(ids))))
+            self._invalidate()
         
-        return len(self.texts) - len(texts), len(self.texts) - 1
+        return ids
     
-    def similarity_search(self, query_text, k=3):
-        """Search for k most similar texts."""
-        # Generate embedding for query
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        query_embedding = model.encode([query_text])[0].astype(np.float32)
+    def _assign_ids(self, texts, ids, reserved=False):
+        """Sequential IDs for texts, or the given ones checked for clashes.
         
-        # Reshape for FAISS
-        query_embedding = np.array([query_embedding])
+        reserved=True accepts IDs that deduplicate() handed out for these texts.
+        """
+        if ids is None:
+            ids = list(range(self._next_id, self._next_id + len(texts)))
+        else:
+            ids = [int(i) for i in ids]
+            if len(ids) != len(texts) or len(set(ids)) != len(ids):
+                raise ValueError("ids must be unique and match texts one to one")
+            existing = [i for i in ids if i in self._id_to_row
+                        or (not reserved and self.deduplicator is not None and i in self.deduplicator)]
+            if existing:
+                raise ValueError(f"IDs already present, use upsert to replace them: {existing[:10]}")
+        self._next_id = max(self._next_id, max(ids, default=-1) + 1)
+        return ids
+    
+    def deduplicate(self, texts, ids=None):
+        """Assign IDs to texts and drop the duplicates, before anything is encoded.
         
-        # Search
-        distances, indices = self.index.search(query_embedding, k)
+        Returns (rows, kept_ids, ids): the positions and IDs of the texts to
+        add, and the IDs of all texts. Kept IDs are reserved, so passing them
+        with the kept texts to add_texts adds them without a second check;
+        stream_ingest uses this to skip encoding duplicates.
+        """
+        texts = list(texts)
+        fingerprints = [self.deduplicator.fingerprint(text) for text in texts]
+        rows = []
+        with self._lock:
+            ids = self._assign_ids(texts, ids)
+            for row, (id_, fingerprint) in enumerate(zip(ids, fingerprints)):
+                # Registered now, so later texts of this batch match it too
+                canonical = self.deduplicator.register(id_, fingerprint)
+                if canonical is None:
+                    rows.append(row)
+                elif not self.deduplicator.is_exact(canonical, fingerprint):
+                    # Kept so the copy can take over if its canonical entry is deleted
+                    self._duplicate_texts[id_] = texts[row]
+            kept_ids = [ids[row] for row in rows]
+            self._reserved.update(kept_ids)
+            if len(rows) < len(ids):
+                self._invalidate()  # results now list the dropped IDs under duplicate_ids
+        return rows, kept_ids, ids
+    
+    def _is_reserved(self, ids):
+        return ids is not None and len(ids) > 0 and all(int(i) in self._reserved for i in ids)
+    
+    def _add_deduplicated(self, texts, embeddings, rows, kept_ids, workers):
+        """Encode and add the texts deduplicate() kept, releasing their IDs if that fails."""
+        if not rows:
+            return
+        try:
+            self.add_texts([texts[row] for row in rows],
+                           None if embeddings is None else np.asarray(embeddings)[rows],
+                           ids=kept_ids, workers=workers)
+        except BaseException:
+            self._release(kept_ids)
+            raise
+    
+    def _release(self, ids):
+        """Undo deduplicate() for IDs whose texts were never added."""
+        with self._lock:
+            for id_ in ids:
+                if id_ in self._reserved:
+                    self._reserved.discard(id_)
+                    for orphan in self.deduplicator.remove(id_):
+                        self._duplicate_texts.pop(orphan, None)
+    
+    def delete(self, ids):
+        """Delete texts by ID; they stop appearing in results immediately.
+        
+        The rows stay in the index as tombstones until compact() is called.
+        Deleting a canonical entry promotes one of its duplicates in its place.
+        Returns the number of IDs that were present.
+        """
+        with self._lock:
+            removed, readd = self._delete(ids)
+        self._readd(readd)
+        return removed
+    
+    def _delete(self, ids):
+        """delete() under the lock; returns (IDs removed, near copies to re-add as (ID, text))."""
+        readd = []
+        with self._lock:
+            ids = [int(i) for i in ids]
+            removed, rows = 0, []
+            # Drop deleted duplicates first, so none of them is promoted below
+            if self.deduplicator is not None:
+                for i in ids:
+                    if i in self.deduplicator.duplicate_of:
+                        self.deduplicator.remove(i)
+                        self._duplicate_texts.pop(i, None)
+                        removed += 1
+            for i in ids:
+                if i in self._id_to_row:
+                    row = self._id_to_row.pop(i)
+                    removed += 1
+                    if self.deduplicator is None or not self._promote(i, row, readd):
+                        rows.append(row)
+            if rows:
+                self._tombstones.update(rows)
+                self._selector = None
+            if removed:
+                self._invalidate()
+        return removed, readd
+    
+    def _readd(self, readd):
+        """Encode and add promoted near copies under their own IDs, outside the lock."""
+        if readd:
+            self._add_deduplicated([text for _, text in readd], None, list(range(len(readd))),
+                                   [id_ for id_, _ in readd], None)
+    
+    def _promote(self, id_, row, readd):
+        """Give the duplicates of a deleted canonical entry a new canonical entry.
+        
+        An exact copy takes over the row under its own ID (returns True, the
+        row stays live). Otherwise the near copies are registered again, and
+        those that become canonical are appended to readd as (ID, text).
+        """
+        duplicates = self.deduplicator.duplicates(id_)
+        exact = [duplicate for duplicate in duplicates if duplicate not in self._duplicate_texts]
+        if exact:
+            self.deduplicator.promote(id_, exact[0])
+            self._id_to_row[exact[0]] = row
+            self._row_ids[row] = exact[0]
+            return True
+        for orphan in self.deduplicator.remove(id_):
+            text = self._duplicate_texts[orphan]
+            if self.deduplicator.add(text, orphan) is None:
+                del self._duplicate_texts[orphan]
+                self._reserved.add(orphan)
+                readd.append((orphan, text))
+        return False
+    
+    def upsert(self, ids, texts, embeddings=None, workers=None):
+        """Insert texts under the given IDs, replacing any texts already stored under them."""
+        texts = list(texts)
+        if self.deduplicator is not None:
+            # Check the new texts against the store without the replaced ones, before encoding
+            with self._lock:
+                _, readd = self._delete(ids)
+                rows, kept_ids, ids = self.deduplicate(texts, ids)
+            self._readd(readd)
+            self._add_deduplicated(texts, embeddings, rows, kept_ids, workers)
+            return ids
+        if embeddings is None:
+            embeddings = self._encode(texts, workers=workers)
+        with self._lock:
+            self.delete(ids)
+            return self.add_texts(texts, embeddings, ids=ids)
+    
+    def get_text(self, id_):
+        """Return the live text stored under an ID (KeyError if absent or deleted).
+        
+        A near-duplicate dropped by deduplication returns its own text, an
+        exact duplicate its canonical text.
+        """
+        id_ = int(id_)
+        if self.deduplicator is not None:
+            if id_ in self._duplicate_texts:
+                return self._duplicate_texts[id_]
+            id_ = self.deduplicator.canonical(id_)
+        return self.texts[self._id_to_row[id_]]
+    
+    @property
+    def deleted_fraction(self):
+        """Share of index rows that are tombstones waiting for compaction."""
+        return len(self._tombstones) / self.index.ntotal if self.index.ntotal else 0.0
+    
+    def compact(self):
+        """Rebuild the index without tombstoned rows to reclaim their space.
+        
+        Only copying the live vectors and swapping in the result hold the
+        store's lock; the expensive rebuild runs while searches continue, and
+        texts added or deleted meanwhile are carried over. IDs are unchanged.
+        Returns the number of rows reclaimed.
+        """
+        with self._compact_lock:
+            return self._compact()
+    
+    def _compact(self):
+        with self._lock:
+            if not self._tombstones:
+                return 0
+            self._ensure_writable()
+            if self._raw_vectors is None:
+                ivf = faiss.try_extract_index_ivf(self.index)
+                if ivf is not None:
+                    # IVF indexes can only reconstruct vectors through a direct map
+                    ivf.make_direct_map()
+            n_rows = self.index.ntotal
+            dropped = np.fromiter(self._tombstones, dtype=np.int64)
+            live_rows = np.setdiff1d(np.arange(n_rows, dtype=np.int64), dropped)
+            live_vectors = self._vectors(live_rows)
+            new_index = faiss.clone_binary_index(self.index) if self._binary else faiss.clone_index(self.index)
         
-        # Return results with distances
+        # Rebuild outside the lock; the clone keeps IVF training and parameters
+        new_index.reset()
+        new_index.add(self._codes(live_vectors))
+        del live_vectors
+        new_raw_vectors = self._raw_vectors.take(live_rows) if self._raw_vectors is not None else None
+        
+        with self._lock:
+            # Carry over rows added while the new index was being built
+            if self.index.ntotal > n_rows:
+                new_rows = np.arange(n_rows, self.index.ntotal, dtype=np.int64)
+                new_vectors = self._vectors(new_rows)
+                new_index.add(self._codes(new_vectors))
+                if new_raw_vectors is not None:
+                    new_raw_vectors.append(new_vectors)
+                live_rows = np.concatenate([live_rows, new_rows])
+            
+            # Map surviving rows to their new positions; rows deleted meanwhile stay tombstoned
+            new_position = {int(row): pos for pos, row in enumerate(live_rows)}
+            self.texts = self.texts.take(live_rows)
+            self._row_ids = array('q', (self._row_ids[row] for row in live_rows))
+            self._id_to_row = {id_: new_position[row] for id_, row in self._id_to_row.items()}
+            self._tombstones = {new_position[row] for row in self._tombstones if row in new_position}
+            reclaimed = self.index.ntotal - new_index.ntotal
+            self.index = new_index
+            self._raw_vectors = new_raw_vectors
+            self._selector = None
+            self._invalidate()
+        
+        return reclaimed
+    
+    def _vectors(self, rows):
+        """Vectors of the given rows, exact from the side file when there is one."""
+        if self._raw_vectors is not None:
+            return self._raw_vectors.rows(rows)
+        return self.index.reconstruct_batch(rows)
+    
+    def compact_in_background(self):
+        """Run compact() in a daemon thread and return the thread."""
+        thread = threading.Thread(target=self.compact, daemon=True)
+        thread.start()
+        return thread
+    
+    def similarity_search(self, query_text, k=3, nprobe=None, ef_search=None):
+        """Search for k most similar texts.
+        
+        nprobe (IVF) and ef_search (HNSW) override the index defaults for this query.
+        """
+        # A single query is a batch of one, so both forms return identical results
+        return self.similarity_search_batch([query_text], k, nprobe=nprobe, ef_search=ef_search)[0]
+    
+    def similarity_search_batch(self, queries, k=3, batch_size=64, nprobe=None, ef_search=None):
+        """Search for the k most similar texts of every query in one pass."""
+        if len(queries) == 0:
+            return []
+        if self.query_cache is None:
+            return self._search_texts(list(queries), k, batch_size, nprobe, ef_search)
+        
+        # Serve repeated queries from the cache; the version is read first so a
+        # result computed during a concurrent mutation is never stored as current
+        version = self._version
+        keys = [(normalize_query(query), k, nprobe, ef_search, version) for query in queries]
+        results = [self.query_cache.get(key) for key in keys]
+        missing = {}
+        for i, (key, result) in enumerate(zip(keys, results)):
+            if result is None:
+                missing.setdefault(key, []).append(i)
+        if missing:
+            fresh = self._search_texts([queries[positions[0]] for positions in missing.values()],
+                                       k, batch_size, nprobe, ef_search)
+            for (key, positions), result in zip(missing.items(), fresh):
+                self.query_cache.put(key, result)
+                for i in positions:
+                    results[i] = result
+        return results
+    
+    def _search_texts(self, queries, k, batch_size, nprobe, ef_search):
+        # Encode all queries together in length-bucketed batches, bypassing the disk cache
+        query_embeddings = self._encode(queries, cache=False, batch_size=batch_size)
+        
+        return self.search_embeddings(query_embeddings, k, nprobe=nprobe, ef_search=ef_search)
+    
+    def search_embeddings(self, query_embeddings, k=3, nprobe=None, ef_search=None):
+        """Search with precomputed query embeddings, one result list per row."""
+        # FAISS needs a contiguous float32 matrix
+        query_embeddings = self._prepare(query_embeddings)
+        
+        with self._lock:
+            # Search all queries at once, skipping deleted rows inside FAISS
+            params = search_parameters(self.index, nprobe=nprobe, ef_search=ef_search,
+                                       selector=self._tombstone_selector())
+            if self._raw_vectors is None:
+                distances, indices = self.index.search(query_embeddings, k, params=params)
+            else:
+                # Over-fetch from the quantized index, then re-rank with exact vectors
+                _, indices = self.index.search(self._codes(query_embeddings), k * self.rescore_factor, params=params)
+                distances, indices = rerank(query_embeddings, indices, self._raw_vectors.rows, k, self.metric)
+            
+            return [self._format_results(row_distances, row_indices)
+                    for row_distances, row_indices in zip(distances, indices)]
+    
+    def _tombstone_selector(self):
+        """FAISS selector rejecting tombstoned rows, or None when there are none."""
+        if not self._tombstones:
+            return None
+        if self._selector is None:
+            # Keep the inner selector referenced: FAISS does not own it
+            deleted = faiss.IDSelectorBatch(np.fromiter(self._tombstones, dtype=np.int64))
+            self._selector = (deleted, faiss.IDSelectorNot(deleted))
+        return self._selector[1]
+    
+    def _prepare(self, embeddings):
+        """Float32 row-major copy of the embeddings, unit length for the cosine metric."""
+        embeddings = np.array(embeddings, dtype=np.float32, order='C').reshape(-1, self.dimension)
+        if self.metric == 'cosine':
+            faiss.normalize_L2(embeddings)
+        return embeddings
+    
+    def _invalidate(self):
+        """Record a change to the searchable contents; cached query results become stale."""
+        self._version += 1
+        if self.query_cache is not None:
+            self.query_cache.clear()
+    
+    def _codes(self, embeddings):
+        """What the index stores for these embeddings: packed sign bits for 'binary', else the floats."""
+        return pack_signs(embeddings) if self._binary else embeddings
+    
+    def _format_results(self, distances, indices):
+        """Turn one row of FAISS output into result dicts with distances or scores."""
+        # L2 returns distances; inner-product metrics return similarities directly
+        value_key = 'distance' if self.metric == 'l2' else 'score'
         results = []
-        for i, (dist, idx) in enumerate(zip(distances[0], indices[0])):
-            if idx < len(self.texts):  # Ensure valid index
-                results.append({
+        for i, (value, idx) in enumerate(zip(distances, indices)):
+            if 0 <= idx < len(self.texts):  # Skip -1 padding when fewer than k hits
+                result = {
+                    'id': self._row_ids[idx],
                     'text': self.texts[idx],
-                    'distance': dist,
+                    value_key: value,
                     'rank': i + 1
-                })
+                }
+                if self.deduplicator is not None:
+                    # IDs of the dropped copies of this text, so every source is reported
+                    result['duplicate_ids'] = self.deduplicator.duplicates(result['id'])
+                results.append(result)
         
         return results
 
-def main():
-    # Initialize vector store
-    store = VectorStore()
+    def _ensure_writable(self):
+        """Copy a memory-mapped index into memory before it is modified."""
+        if self._index_mapped:
+            if self._binary:
+                self.index = faiss.deserialize_index_binary(faiss.serialize_index_binary(self.index))
+            else:
+                self.index = faiss.deserialize_index(faiss.serialize_index(self.index))
+            self._index_mapped = False
     
-    # Get the absolute path to the sample texts
+    def _snapshot_header(self):
+        """Describe the embedding space so a snapshot can be checked on load."""
+        return {
+            'model_name': self.model_name,
+            'dimension': self.dimension,
+            'index_type': self.index_type,
+            'metric': self.metric,
+            'next_id': self._next_id,
+            'rescore': self._raw_vectors is not None,
+            'rescore_factor': self.rescore_factor,
+            'index_params': self.index_params,
+            'model_revision': self.model_revision,
+            'model_fingerprint': snapshot.model_fingerprint(self.model_name, self.dimension),
+            'dedup_threshold': self.deduplicator.threshold if self.deduplicator is not None else None,
+        }
+    
+    def save(self, path):
+        """Save the index, texts, IDs and tombstones to a snapshot directory."""
+        with self._lock:
+            arrays = {
+                'ids': np.frombuffer(self._row_ids, dtype=np.int64) if self._row_ids else np.empty(0, dtype=np.int64),
+                'tombstones': np.array(sorted(self._tombstones), dtype=np.int64),
+            }
+            if self.deduplicator is not None:
+                duplicate_of = self.deduplicator.duplicate_of
+                arrays['duplicate_ids'] = np.fromiter(duplicate_of.keys(), dtype=np.int64, count=len(duplicate_of))
+                arrays['canonical_ids'] = np.fromiter(duplicate_of.values(), dtype=np.int64, count=len(duplicate_of))
+                arrays['near_duplicate_ids'] = np.fromiter(self._duplicate_texts, dtype=np.int64,
+                                                           count=len(self._duplicate_texts))
+                arrays['near_duplicate_texts'] = np.array(list(self._duplicate_texts.values()), dtype=str)
+            files = {VECTORS_FILE: self._raw_vectors.path} if self._raw_vectors is not None else {}
+            snapshot.write_snapshot(path, self.index, self.texts, self._snapshot_header(), arrays, files)
+    
+    @classmethod
+    def load(cls, path, mmap=True, model_name=DEFAULT_MODEL, query_cache_size=0, query_cache_ttl=300.0,
+             rescore_dir=None):
+        """Open a snapshot, memory-mapped by default; stale snapshots raise ValueError."""
+        header = snapshot.read_header(path)
+        store = cls(dimension=header['dimension'], model_name=model_name,
+                    index_type=header.get('index_type', 'flat'), metric=header.get('metric', 'l2'),
+                    rescore_factor=header['rescore_factor'], query_cache_size=query_cache_size,
+                    query_cache_ttl=query_cache_ttl, dedup_threshold=header.get('dedup_threshold'),
+                    rescore_dir=rescore_dir,
+                    **header.get('index_params', {}))
+        _, store.index, store.texts, arrays = snapshot.read_snapshot(
+            path, snapshot.model_fingerprint(model_name, header['dimension']), mmap=mmap
+        )
+        store._index_mapped = mmap
+        store._row_ids = array('q', arrays['ids'].tobytes())
+        store._tombstones = set(arrays['tombstones'].tolist())
+        store._id_to_row = {int(id_): row for row, id_ in enumerate(arrays['ids'])
+                            if row not in store._tombstones}
+        store._next_id = header['next_id']
+        # Checked against the loaded weights before the first encode, so loading needs no model
+        store.model_revision = header.get('model_revision')
+        if header['rescore']:
+            # Exact vectors are read from the snapshot's file until the first add copies it
+            store._raw_vectors = VectorFile(header['dimension'], os.path.join(path, VECTORS_FILE), read_only=True,
+                                           directory=rescore_dir)
+        if store.deduplicator is not None:
+            # Signatures are not saved; fingerprint the live texts again
+            for id_, row in store._id_to_row.items():
+                store.deduplicator.insert(id_, store.deduplicator.fingerprint(store.texts[row]))
+            store._duplicate_texts = dict(zip(arrays['near_duplicate_ids'].tolist(),
+                                              arrays['near_duplicate_texts'].tolist()))
+            for id_, canonical in zip(arrays['duplicate_ids'].tolist(), arrays['canonical_ids'].tolist()):
+                store.deduplicator.mark_duplicate(id_, canonical, exact=id_ not in store._duplicate_texts)
+        return store
+
+def main():
+    # Get the absolute path to the sample texts and the snapshot
     current_dir = os.path.dirname(__file__)
     data_path = os.path.join(os.path.dirname(current_dir), 'data', 'sample_texts.txt')
+    snapshot_path = os.path.join(os.path.dirname(current_dir), 'data', 'vector_store.snapshot')
     
-    # Read sample texts
-    with open(data_path, 'r') as f:
-        texts = f.read().splitlines()
-    
-    # Add texts to store
-    print("Adding texts to vector store...")
-    start_idx, end_idx = store.add_texts(texts)
-    print(f"Added {end_idx - start_idx + 1} texts to store")
+    # Reuse a saved snapshot instead of re-embedding the corpus
+    try:
+        store = VectorStore.load(snapshot_path)
+        print(f"Loaded {len(store)} texts from snapshot")
+    except ValueError as e:
+        print(f"Building a new index ({e})")
+        store = VectorStore()
+        
+        # Read sample texts
+        with open(data_path, 'r') as f:
+            texts = f.read().splitlines()
+        
+        # Add texts to store
+        print("Adding texts to vector store...")
+        ids = store.add_texts(texts)
+        print(f"Added {len(ids)} texts to store")
+        store.save(snapshot_path)
     
     # Perform sample searches
     example_queries = [
@@ -75,9 +591,10 @@ def main():
     ]
     
     print("\nPerforming sample searches:")
-    for query in example_queries:
+    # Encode and search all example queries in a single batch
+    batch_results = store.similarity_search_batch(example_queries)
+    for query, results in zip(example_queries, batch_results):
         print(f"\nQuery: {query}")
-        results = store.similarity_search(query)
         print("\nTop 3 most similar texts:")
         for result in results:
             print(f"{result['rank']}. {result['text']} (distance: {result['distance']:.4f})")
@@ -1,5 +1,9 @@
 import os
-from typing import List, Dict
+import re
+from collections import OrderedDict
+from typing import Any, List, Dict, Optional
+import faiss
+import numpy as np
 from langchain_openai import OpenAIEmbeddings, OpenAI
 from langchain_community.vectorstores import FAISS
 from langchain.schema import Document
@@ -8,6 +12,7 @@ from operator import itemgetter
 import time
 from dotenv import load_dotenv
 import json
+import ast
 import __main__
 __main__.__file__ = 'vector_search.py'
 
@@ -36,6 +41,189 @@ sample_data = [
     ),
 ]
 
+class MetadataIndex:
+    """Inverted index from metadata values to bitmaps of FAISS index positions"""
+
+    def __init__(self):
+        self.size = 0
+        self._bitmaps: Dict[str, Dict[Any, np.ndarray]] = {}
+
+    @classmethod
+    def from_store(cls, db: FAISS) -> "MetadataIndex":
+        """Index the metadata of every document in a FAISS store, in index order"""
+        index = cls()
+        index.add([db.docstore.search(db.index_to_docstore_id[i]).metadata for i in range(db.index.ntotal)])
+        return index
+
+    def add(self, metadatas: List[Dict]) -> None:
+        """Index the metadata of documents appended to the FAISS index"""
+        start = self.size
+        self.size += len(metadatas)
+        for offset, metadata in enumerate(metadatas):
+            for key, value in metadata.items():
+                if not isinstance(value, (str, int, float, bool)):
+                    continue
+                values = self._bitmaps.setdefault(key, {})
+                bitmap = values.get(value)
+                if bitmap is None or len(bitmap) < self.size:
+                    grown = np.zeros(self.size, dtype=bool)
+                    if bitmap is not None:
+                        grown[:len(bitmap)] = bitmap
+                    values[value] = bitmap = grown
+                bitmap[start + offset] = True
+
+    def vocabulary(self) -> Dict[str, List[Any]]:
+        """Known values of every indexed attribute"""
+        return {key: list(values) for key, values in self._bitmaps.items()}
+
+    def match(self, filter_dict: Dict) -> np.ndarray:
+        """Bitmap of the positions whose metadata satisfies every filter (a list value means any of)"""
+        bitmap = np.ones(self.size, dtype=bool)
+        for key, wanted in filter_dict.items():
+            allowed = np.zeros(self.size, dtype=bool)
+            for value in wanted if isinstance(wanted, (list, tuple, set)) else [wanted]:
+                value_bitmap = self._bitmaps.get(key, {}).get(value)
+                if value_bitmap is not None:
+                    allowed[:len(value_bitmap)] |= value_bitmap
+            bitmap &= allowed
+        return bitmap
+
+
+SELF_QUERY_TEMPLATE = """Extract search filters from this query. Output as a Python dict with keys 'type', 'color', or 'material'.
+Only include filters explicitly mentioned. If no filters mentioned, return empty dict.
+
+Query: {query}
+
+Output format example: {{"type": "clothing", "color": "blue"}}"""
+
+
+# Words that add no constraint, so a query made only of these and known values needs no LLM
+FILTER_STOPWORDS = frozenset("""
+    a an the some any all me i we us you show find get give list search look looking for want need
+    with and or in of made from that are is which please items item things products stuff
+""".split())
+
+
+def normalize_query(query: str) -> str:
+    """Lower-case words of a query, without punctuation"""
+    return " ".join(re.findall(r"\w+", query.lower()))
+
+
+class FilterExtractor:
+    """Turns a natural-language query into a metadata filter, calling the LLM only when needed
+
+    Three tiers, cheapest first: a matcher over the metadata values known to
+    the store, a cache of earlier LLM parses keyed on the normalized query,
+    and the LLM itself, whose output is validated against the known values.
+    """
+
+    def __init__(self, metadata_index: MetadataIndex, llm, cache_size: int = 1024):
+        self.metadata_index = metadata_index
+        self.chain = PromptTemplate(template=SELF_QUERY_TEMPLATE, input_variables=["query"]) | llm
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._terms: Dict[str, List[tuple]] = {}
+        self._indexed_size = -1
+        self.stats = {"vocabulary": 0, "cache": 0, "llm": 0}
+
+    def _vocabulary_terms(self) -> Dict[str, List[tuple]]:
+        """Map of normalized value -> (attribute, value) pairs, rebuilt when documents are added"""
+        if self._indexed_size != self.metadata_index.size:
+            terms: Dict[str, List[tuple]] = {}
+            for key, values in self.metadata_index.vocabulary().items():
+                for value in values:
+                    if isinstance(value, str) and normalize_query(value):
+                        terms.setdefault(normalize_query(value), []).append((key, value))
+            self._terms = terms
+            self._indexed_size = self.metadata_index.size
+        return self._terms
+
+    def match_vocabulary(self, query: str) -> Optional[Dict]:
+        """Filter from known metadata values, or None unless they account for every word of the query
+
+        Any other word ("green", "shirts", "under 50") may be a constraint the
+        vocabulary cannot express, so such queries are left to the LLM rather
+        than answered with a partial filter.
+        """
+        terms = self._vocabulary_terms()
+        longest = max((term.count(" ") + 1 for term in terms), default=0)
+        words = normalize_query(query).split()
+        filter_dict: Dict[str, Any] = {}
+        i = 0
+        while i < len(words):
+            # Longest known phrase starting here, also trying simple plurals ("chairs", "dresses")
+            for n in range(min(longest, len(words) - i), 0, -1):
+                phrase = " ".join(words[i:i + n])
+                candidates = [phrase, phrase[:-1] if phrase.endswith("s") else None,
+                              phrase[:-2] if phrase.endswith("es") else None]
+                matches = next((terms[c] for c in candidates if c in terms), None)
+                if matches is not None:
+                    break
+            else:
+                if words[i] not in FILTER_STOPWORDS:
+                    return None
+                i += 1
+                continue
+            if len(matches) > 1:
+                return None  # the same word is a value of several attributes
+            key, value = matches[0]
+            if key in filter_dict and value not in filter_dict[key]:
+                filter_dict[key].append(value)  # "blue or red" means either
+            else:
+                filter_dict.setdefault(key, [value])
+            i += n
+        if not filter_dict:
+            return None
+        return {key: values[0] if len(values) == 1 else values for key, values in filter_dict.items()}
+
+    def parse_llm_output(self, output: str) -> Optional[Dict]:
+        """Validated filter from an LLM completion: known attributes only, None if unparseable"""
+        found = re.search(r"\{.*\}", output, re.DOTALL)
+        if found is None:
+            return None
+        try:
+            parsed = json.loads(found.group(0))
+        except json.JSONDecodeError:
+            try:
+                parsed = ast.literal_eval(found.group(0))  # the prompt asks for a Python dict
+            except (ValueError, SyntaxError):
+                return None
+        if not isinstance(parsed, dict):
+            return None
+        vocabulary = self.metadata_index.vocabulary()
+        filter_dict = {}
+        for key, wanted in parsed.items():
+            if key not in vocabulary:
+                continue  # not an attribute of the store's documents
+            known = {normalize_query(v): v for v in vocabulary[key] if isinstance(v, str)}
+            # Known values are spelled as stored; unknown ones stay and match nothing
+            values = [known.get(normalize_query(w), w) for w in (wanted if isinstance(wanted, list) else [wanted])
+                      if isinstance(w, (str, int, float, bool))]
+            if values:
+                filter_dict[key] = values[0] if len(values) == 1 else values
+        return filter_dict
+
+    def extract(self, query: str) -> Dict:
+        """Metadata filter for a query: vocabulary match, else cached LLM parse, else LLM"""
+        filter_dict = self.match_vocabulary(query)
+        if filter_dict is not None:
+            self.stats["vocabulary"] += 1
+            return filter_dict
+        key = normalize_query(query)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.stats["cache"] += 1
+            return dict(self._cache[key])
+        self.stats["llm"] += 1
+        filter_dict = self.parse_llm_output(str(self.chain.invoke({"query": query})))
+        if filter_dict is None:
+            return {}  # not cached, so the next identical query asks again
+        self._cache[key] = filter_dict
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return dict(filter_dict)
+
+
 class VectorSearchDemo:
     def __init__(self):
         self.embeddings = OpenAIEmbeddings()
@@ -43,36 +231,46 @@ class VectorSearchDemo:
             documents=sample_data,
             embedding=self.embeddings
         )
+        self.metadata_index = MetadataIndex.from_store(self.db)
         self.llm = OpenAI(temperature=0)
+        self.filter_extractor = FilterExtractor(self.metadata_index, self.llm)
+
+    def add_documents(self, documents: List[Document]) -> None:
+        """Add documents to the vector store and the metadata index"""
+        self.db.add_documents(documents)
+        self.metadata_index.add([doc.metadata for doc in documents])
 
-    def filtered_vector_search(self, query: str, filter_dict: Dict) -> List[Document]:
+    def _filtered_search(self, query: str, filter_dict: Dict, k: int) -> List[Document]:
+        """Top k documents matching the filter, searching only the positions the filter allows"""
+        bitmap = self.metadata_index.match(filter_dict)
+        n_matches = int(bitmap.sum())
+        if n_matches == 0:
+            return []
+        embedding = np.array([self.embeddings.embed_query(query)], dtype=np.float32)
+        if self.db._normalize_L2:
+            faiss.normalize_L2(embedding)
+        # FAISS skips every position outside the bitmap, so no hits are lost to the filter
+        selector = faiss.IDSelectorBitmap(np.packbits(bitmap, bitorder='little'))
+        _, positions = self.db.index.search(embedding, min(k, n_matches),
+                                            params=faiss.SearchParameters(sel=selector))
+        return [self.db.docstore.search(self.db.index_to_docstore_id[i]) for i in positions[0] if i >= 0]
+
+    def filtered_vector_search(self, query: str, filter_dict: Dict, k: int = 2) -> List[Document]:
         """Perform filtered vector search"""
         start_time = time.time()
-        results = [doc for doc in self.db.similarity_search(query, k=4)
-                  if all(doc.metadata.get(k) == v for k, v in filter_dict.items())][:2]
+        results = self._filtered_search(query, filter_dict, k)
         end_time = time.time()
         print(f"\nFiltered Vector Search Latency: {end_time - start_time:.4f} seconds")
         return results
 
     def self_query_vector_search(self, query: str) -> List[Document]:
-        """Perform self-query vector search using LLM to parse filters"""
-        template = """Extract search filters from this query. Output as a Python dict with keys 'type', 'color', or 'material'.
-Only include filters explicitly mentioned. If no filters mentioned, return empty dict.
-
-Query: {query}
-
-Output format example: {{"type": "clothing", "color": "blue"}}"""
-        
-        prompt = PromptTemplate(template=template, input_variables=["query"])
-        chain = prompt | self.llm | (lambda x: json.loads(x))
-        
+        """Perform self-query vector search, using the LLM to parse filters only when known values do not"""
         start_time = time.time()
-        # Get filters from LLM
-        filter_dict = chain.invoke({"query": query})
+        # Get filters locally when possible, else from the cache or the LLM
+        filter_dict = self.filter_extractor.extract(query)
         
         # Perform filtered search
-        results = [doc for doc in self.db.similarity_search(query, k=4)
-                  if all(doc.metadata.get(k) == v for k, v in filter_dict.items())][:2]
+        results = self._filtered_search(query, filter_dict, k=2)
         end_time = time.time()
         print(f"\nSelf-Query Vector Search Latency: {end_time - start_time:.4f} seconds")
         return results
@@ -129,6 +327,7 @@ def main():
     for doc in results:
         print(f"Content: {doc.page_content}")
         print(f"Metadata: {doc.metadata}\n")
+    print(f"Filter sources so far: {demo.filter_extractor.stats}")
     
     # Test query expansion search
     print("\n=== Query Expansion Search ===")